@@ -0,0 +1,336 @@
+"""
+Bit-packed alert history.
+
+Every alert has a permanent bit position in data/alerts/registry.json; new
+alerts get the next free ID and retired ones keep theirs, so stored words
+stay readable when the spec changes. A session's alert values are two
+bitsets: `hit` (triggered) and `known` (evaluated; unset bits are NA).
+
+Group counts are masked popcounts, popcount(hit & group mask), computed
+for every session at once; classify() derives state and severity from
+them with the same rules as indicators.classify(), which uses it.
+
+The history is stored like the price store, as raw little-endian arrays
+plus a meta.json (row count, word size and count, last stored day):
+
+  dates.bin   int32 days since 1970-01-01
+  hit.bin     one word per session (uint8 to uint64, by registry size;
+  known.bin   several uint64 words past 64 alerts)
+
+For the 15 configured alerts that is 8 bytes a session, about 20 KB for a
+decade of daily sessions.
+
+Usage:
+    python scripts/alert_bits.py build [--start YYYY-MM-DD]
+    python scripts/alert_bits.py show [--start YYYY-MM-DD] [--end YYYY-MM-DD] [ALERT ...]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import sidecar
+
+STORE_DIR = Path("data/alerts")
+REGISTRY_FILE = STORE_DIR / "registry.json"
+
+WORD_BITS = 64
+DATE_DTYPE = "<i4"
+
+# Popcount of every byte, for numpy builds without bitwise_count
+BYTE_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+# ---- REGISTRY ----
+
+def load_registry(path=REGISTRY_FILE):
+    return (sidecar.read_json(path) or {"ids": {}})["ids"]
+
+
+def save_registry(registry, path=REGISTRY_FILE):
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    sidecar.write_json(path, {"ids": registry})
+
+
+def register(names, registry):
+    """
+    `registry` with an ID for every name in `names`; existing IDs never
+    change.
+    """
+    registry = dict(registry)
+    for name in names:
+        if name not in registry:
+            registry[name] = max(registry.values(), default=-1) + 1
+    return registry
+
+
+def word_count(registry):
+    return max(1, -(-(max(registry.values(), default=-1) + 1) // WORD_BITS))
+
+
+def storage_dtype(registry):
+    """
+    Smallest unsigned dtype that holds every ID in one word, else uint64.
+    """
+    bits = max(registry.values(), default=-1) + 1
+    for dtype in ("<u1", "<u2", "<u4"):
+        if bits <= np.dtype(dtype).itemsize * 8:
+            return dtype
+    return "<u8"
+
+
+# ---- BITSETS ----
+
+def mask(names, registry):
+    """
+    One row of words with the bits of `names` set. Names without an ID are
+    ignored: an unregistered alert never triggers.
+    """
+    words = np.zeros(word_count(registry), dtype=np.uint64)
+    for name in names:
+        if name in registry:
+            i = registry[name]
+            words[i // WORD_BITS] |= np.uint64(1) << np.uint64(i % WORD_BITS)
+    return words
+
+
+def pack_arrays(values, registry, rows):
+    """
+    Word array, shape (rows, words), with each alert's bit set where its
+    bool array in {alert: array} is True.
+    """
+    words = np.zeros((rows, word_count(registry)), dtype=np.uint64)
+    for name, flags in values.items():
+        i = registry[name]
+        words[:, i // WORD_BITS] |= np.asarray(flags, dtype=np.uint64) << np.uint64(i % WORD_BITS)
+    return words
+
+
+def pack(matrix, registry):
+    """
+    (hit, known) word arrays, shape (sessions, words), for a nullable
+    boolean alert matrix (one column per alert). Every column must have an
+    ID.
+    """
+    triggered = {name: matrix[name].fillna(False).to_numpy(dtype=bool) for name in matrix.columns}
+    present = {name: matrix[name].notna().to_numpy() for name in matrix.columns}
+    return pack_arrays(triggered, registry, len(matrix)), pack_arrays(present, registry, len(matrix))
+
+
+def test(words, name, registry):
+    """
+    Whether `name`'s bit is set in each row (False if it has no ID).
+    """
+    if name not in registry:
+        return np.zeros(len(words), dtype=bool)
+    i = registry[name]
+    return (words[:, i // WORD_BITS] >> np.uint64(i % WORD_BITS)) & np.uint64(1) == 1
+
+
+def unpack(hit, known, registry, names=None):
+    """
+    Nullable boolean DataFrame (one column per alert) from word arrays.
+    """
+    names = list(registry) if names is None else names
+    columns = {}
+    for name in names:
+        values = pd.array(test(hit, name, registry), dtype="boolean")
+        values[~test(known, name, registry)] = pd.NA
+        columns[name] = values
+    return pd.DataFrame(columns)
+
+
+def popcount(words):
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(words)
+    as_bytes = words.view(np.uint8).reshape(*words.shape, words.itemsize)
+    return BYTE_POPCOUNT[as_bytes].sum(axis=-1)
+
+
+def count(hit, group_mask):
+    """
+    Triggered alerts of a group in every row.
+    """
+    return popcount(hit & group_mask).sum(axis=1).astype(np.int64)
+
+
+def regimes(hit, registry, rules):
+    """
+    (downturn, recovery, severity, downturn count, recovery count) arrays
+    for every row of `hit` under one profile's rules.
+    """
+    downturn_count = count(hit, mask(rules["downturn_alerts"], registry))
+    recovery_count = count(hit, mask(rules["recovery_alerts"], registry))
+
+    downturn = test(hit, rules["downturn_anchor"], registry)
+    recovery = (
+        ~downturn
+        & test(hit, rules["recovery_anchor"], registry)
+        & (recovery_count >= rules["recovery_min_alerts"])
+    )
+
+    steps = rules["severity_steps"]
+    severity = np.where(
+        downturn,
+        np.searchsorted(steps, downturn_count, "right"),
+        np.where(recovery, np.searchsorted(steps, recovery_count, "right"), 0),
+    )
+    return downturn, recovery, severity, downturn_count, recovery_count
+
+
+def classify(hit, registry, rules):
+    """
+    (state, severity, downturn count, recovery count) arrays for every row
+    of `hit` under one profile's rules.
+    """
+    downturn, recovery, severity, downturn_count, recovery_count = regimes(hit, registry, rules)
+    state = np.where(downturn, "DOWNTURN", np.where(recovery, "RECOVERY", "NOMINAL")).astype(object)
+    return state, severity, downturn_count, recovery_count
+
+
+# ---- STORAGE ----
+
+def read_meta(store_dir=STORE_DIR):
+    return sidecar.read_json(Path(store_dir) / "meta.json")
+
+
+def write_meta(meta, store_dir=STORE_DIR):
+    sidecar.write_json(Path(store_dir) / "meta.json", meta)
+
+
+def to_days(dates):
+    return np.asarray(pd.DatetimeIndex(dates).to_numpy("datetime64[D]").astype(np.int64), dtype=DATE_DTYPE)
+
+
+def write(dates, hit, known, registry, store_dir=STORE_DIR):
+    """
+    Replace the stored history.
+    """
+    path = Path(store_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    dtype = storage_dtype(registry)
+
+    days = to_days(dates)
+    days.tofile(path / "dates.bin")
+    hit.astype(dtype).tofile(path / "hit.bin")
+    known.astype(dtype).tofile(path / "known.bin")
+    instrument.add(bytes_written=len(hit) * (np.dtype(DATE_DTYPE).itemsize + 2 * hit.shape[1] * np.dtype(dtype).itemsize))
+
+    last = int(days[-1]) if len(days) else None
+    write_meta({"rows": len(hit), "words": hit.shape[1], "dtype": dtype, "last": last}, store_dir)
+    return len(hit)
+
+
+def read(store_dir=STORE_DIR):
+    """
+    (dates as datetime64[D], hit, known) of the stored history, with the
+    words widened to uint64. None if nothing is stored.
+    """
+    meta = read_meta(store_dir)
+    if meta is None:
+        return None
+    path = Path(store_dir)
+    rows, words = meta["rows"], meta["words"]
+    days = np.fromfile(path / "dates.bin", dtype=DATE_DTYPE, count=rows)
+    hit = np.fromfile(path / "hit.bin", dtype=meta["dtype"], count=rows * words).reshape(rows, words)
+    known = np.fromfile(path / "known.bin", dtype=meta["dtype"], count=rows * words).reshape(rows, words)
+    return days.astype("datetime64[D]"), hit.astype(np.uint64), known.astype(np.uint64)
+
+
+def record(date, alerts, store_dir=STORE_DIR, registry_file=REGISTRY_FILE):
+    """
+    Store one session's {alert: True/False/NA}, replacing any row already
+    stored for that date. Newer sessions are appended, checked against the
+    last stored day in meta.json alone; anything else reads and rewrites
+    the history.
+    """
+    registry = register(alerts, load_registry(registry_file))
+    row = pd.DataFrame({name: pd.array([value], dtype="boolean") for name, value in alerts.items()})
+    hit, known = pack(row, registry)
+    day = to_days([date])
+
+    meta = read_meta(store_dir)
+    fits = meta is not None and "last" in meta and meta["dtype"] == storage_dtype(registry) and meta["words"] == hit.shape[1]
+    if fits and (meta["last"] is None or meta["last"] < int(day[0])):
+        path = Path(store_dir)
+        for name, values in (("dates.bin", day), ("hit.bin", hit.astype(meta["dtype"])), ("known.bin", known.astype(meta["dtype"]))):
+            sidecar.append_at(path / name, meta["rows"] * values.itemsize * values[0].size, values.tobytes())
+        meta["rows"] += 1
+        meta["last"] = int(day[0])
+        write_meta(meta, store_dir)
+    else:
+        stored = read(store_dir)
+        days, old_hit, old_known = stored if stored is not None else (np.array([], dtype="datetime64[D]"), None, None)
+        width = hit.shape[1]
+        keep = days != day[0].astype("datetime64[D]")
+        new_hit = np.zeros((int(keep.sum()) + 1, width), dtype=np.uint64)
+        new_known = np.zeros_like(new_hit)
+        if old_hit is not None:
+            new_hit[:-1, :old_hit.shape[1]] = old_hit[keep]
+            new_known[:-1, :old_known.shape[1]] = old_known[keep]
+        new_hit[-1], new_known[-1] = hit[0], known[0]
+        all_days = np.r_[days[keep], day.astype("datetime64[D]")]
+        order = np.argsort(all_days, kind="stable")
+        write(all_days[order], new_hit[order], new_known[order], registry, store_dir)
+
+    save_registry(registry, registry_file)
+
+
+def query(start=None, end=None, names=None, store_dir=STORE_DIR, registry_file=REGISTRY_FILE):
+    """
+    Stored alert values between `start` and `end` (inclusive) as a nullable
+    boolean DataFrame indexed by date.
+    """
+    stored = read(store_dir)
+    if stored is None:
+        return pd.DataFrame()
+    days, hit, known = stored
+    lo = 0 if start is None else int(np.searchsorted(days, np.datetime64(str(start)[:10], "D"), "left"))
+    hi = len(days) if end is None else int(np.searchsorted(days, np.datetime64(str(end)[:10], "D"), "right"))
+    frame = unpack(hit[lo:hi], known[lo:hi], load_registry(registry_file), names)
+    frame.index = pd.DatetimeIndex(days[lo:hi], name="date")
+    return frame
+
+
+def build(start=None, store_dir=STORE_DIR, registry_file=REGISTRY_FILE):
+    """
+    Evaluate the alert matrix at every stored session and store it.
+    """
+    import regimes
+    from indicators import load_prices
+
+    matrix = regimes.daily_matrix(load_prices(), start)
+    registry = register(matrix.columns, load_registry(registry_file))
+    hit, known = pack(matrix, registry)
+    write(matrix.index, hit, known, registry, store_dir)
+    save_registry(registry, registry_file)
+    return len(matrix), registry
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    build_cmd = sub.add_parser("build", help="store the alert matrix at every session")
+    build_cmd.add_argument("--start", help="first session (default: first date with data for every symbol)")
+    show_cmd = sub.add_parser("show", help="print stored alert values")
+    show_cmd.add_argument("--start")
+    show_cmd.add_argument("--end")
+    show_cmd.add_argument("alerts", nargs="*", metavar="ALERT")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows, registry = build(args.start)
+        meta = read_meta()
+        size = sum((STORE_DIR / name).stat().st_size for name in ("dates.bin", "hit.bin", "known.bin"))
+        print(f"✅ Alert history stored — {rows} sessions x {len(registry)} alerts, {size:,} bytes ({meta['dtype']} words)")
+        return
+
+    frame = query(args.start, args.end, args.alerts or None)
+    print(frame.to_string() if not frame.empty else "ℹ️  No stored alert sessions in that range")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,290 @@
+"""
+Alert edge-event log.
+
+Every time an alert starts or stops triggering is one event: (day, alert
+ID, edge), with edge +1 when it triggers and -1 when it clears. Events come
+from one diff pass over the bit-packed alert history (alert_bits.py), so
+they cover every stored session. Sessions where an alert could not be
+evaluated (NA) keep its previous value, and an alert is off before its
+first session.
+
+The log sits next to the history in data/alerts:
+
+  events.bin          EVENT records sorted by (day, alert): the date index
+  events_alert.bin    int32 positions into events.bin sorted by
+                      (alert, day); offsets[id] in events.json is where
+                      each alert's run starts
+  events.json         rows, offsets and `through` (last session diffed)
+
+Each run re-diffs from the earlier of `through` and the live session, so a
+rerun that replaces the live row replaces its events too.
+
+Usage:
+    python scripts/alert_events.py build
+    python scripts/alert_events.py show [--start YYYY-MM-DD] [--end YYYY-MM-DD] [ALERT ...]
+    python scripts/alert_events.py status [--start YYYY-MM-DD] [--end YYYY-MM-DD] [ALERT ...]
+"""
+
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import alert_bits
+import instrument
+import sidecar
+from sidecar import day
+
+STORE_DIR = alert_bits.STORE_DIR
+EVENT = np.dtype([("day", "<i4"), ("alert", "<u2"), ("edge", "i1")])
+EDGES = {1: "triggered", -1: "cleared"}
+
+
+# ---- EDGES ----
+
+def bits(words, width):
+    """
+    (rows, width) bool array of bits 0..width-1 of each row of words.
+    """
+    ids = np.arange(width)
+    shifted = words[:, ids // alert_bits.WORD_BITS] >> (ids % alert_bits.WORD_BITS).astype(np.uint64)
+    return (shifted & np.uint64(1)).astype(bool)
+
+
+def edges(days, hit, known, prior):
+    """
+    EVENT records for every change of value in the rows of (hit, known),
+    starting from `prior` (bool per alert ID). NA values carry the previous
+    value forward. Returns (events, value after the last row).
+    """
+    width = len(prior)
+    on, seen = bits(hit, width), bits(known, width)
+
+    # Row of the last known value at or before each row, -1 if none yet.
+    rows = np.arange(len(days))[:, None]
+    last = np.maximum.accumulate(np.where(seen, rows, -1), axis=0)
+    value = np.where(last >= 0, on[np.maximum(last, 0), np.arange(width)], prior)
+
+    previous = np.vstack([prior[None, :], value[:-1]])
+    row, alert = np.nonzero(value != previous)
+    events = np.empty(len(row), dtype=EVENT)
+    events["day"] = days[row]
+    events["alert"] = alert
+    events["edge"] = np.where(value[row, alert], 1, -1)
+    final = value[-1] if len(value) else prior
+    return events, final
+
+
+def active(events, width):
+    """
+    Whether each alert ID is on after `events` (its last edge is +1).
+    """
+    state = np.zeros(width, dtype=bool)
+    if len(events):
+        # First occurrence in the reversed log is each alert's last event.
+        alerts, first = np.unique(events["alert"][::-1], return_index=True)
+        state[alerts] = events["edge"][::-1][first] > 0
+    return state
+
+
+# ---- STORAGE ----
+
+def read_meta(store_dir=STORE_DIR):
+    return sidecar.read_json(Path(store_dir) / "events.json")
+
+
+def write_meta(meta, store_dir=STORE_DIR):
+    sidecar.write_json(Path(store_dir) / "events.json", meta)
+
+
+def read(store_dir=STORE_DIR):
+    """
+    (events, alert index, meta), or None if there is no log.
+    """
+    meta = read_meta(store_dir)
+    if meta is None:
+        return None
+    path = Path(store_dir)
+    events = np.fromfile(path / "events.bin", dtype=EVENT, count=meta["rows"])
+    by_alert = np.fromfile(path / "events_alert.bin", dtype="<i4", count=meta["rows"])
+    return events, by_alert, meta
+
+
+def write(events, keep, through, width, store_dir=STORE_DIR):
+    """
+    Keep the first `keep` stored events and append `events` after them,
+    then rewrite the alert index.
+    """
+    path = Path(store_dir)
+    path.mkdir(parents=True, exist_ok=True)
+    log = path / "events.bin"
+    sidecar.append_at(log, keep * EVENT.itemsize, events.tobytes())
+    instrument.add(bytes_written=len(events) * EVENT.itemsize)
+
+    rows = keep + len(events)
+    alerts = np.fromfile(log, dtype=EVENT, count=rows)["alert"]
+    order = np.argsort(alerts, kind="stable").astype("<i4")
+    order.tofile(path / "events_alert.bin")
+    offsets = np.searchsorted(alerts[order], np.arange(width + 1), "left")
+
+    write_meta({"rows": rows, "through": str(through), "offsets": offsets.tolist()}, store_dir)
+    return rows
+
+
+def update(since=None, store_dir=STORE_DIR):
+    """
+    Extend the log with the stored sessions after the last one diffed, or
+    re-diff from `since` if that is earlier. Returns the events added.
+    """
+    stored = alert_bits.read(store_dir)
+    if stored is None:
+        return 0
+    days, hit, known = stored
+    width = hit.shape[1] * alert_bits.WORD_BITS
+
+    log = read(store_dir)
+    start = None
+    if log is not None:
+        start = np.datetime64(log[2]["through"], "D")
+        if since is not None:
+            start = min(start, np.datetime64(str(since)[:10], "D"))
+
+    if start is None:
+        kept = np.zeros(0, dtype=EVENT)
+    else:
+        kept = log[0][log[0]["day"] < start.astype(np.int64)]
+    first = 0 if start is None else int(np.searchsorted(days, start, "left"))
+
+    added, _ = edges(days[first:].astype(np.int64), hit[first:], known[first:], active(kept, width))
+    through = days[-1] if len(days) else start
+    write(added, len(kept), through, width, store_dir)
+    return len(added)
+
+
+def build(store_dir=STORE_DIR):
+    """
+    Rebuild the log from the whole stored history.
+    """
+    meta = Path(store_dir) / "events.json"
+    meta.unlink(missing_ok=True)
+    return update(store_dir=store_dir)
+
+
+# ---- QUERIES ----
+
+class EventLog:
+    """
+    Read-only view of the log for queries by alert name and date.
+    """
+
+    def __init__(self, store_dir=STORE_DIR, registry_file=alert_bits.REGISTRY_FILE):
+        log = read(store_dir)
+        if log is None:
+            raise FileNotFoundError(f"No alert event log in {store_dir}; run 'alert_events.py build'")
+        self.events, self.by_alert, meta = log
+        self.offsets = meta["offsets"]
+        self.through = pd.Timestamp(meta["through"])
+        self.registry = alert_bits.load_registry(registry_file)
+
+    def alert_events(self, name):
+        """
+        This alert's events, in date order.
+        """
+        i = self.registry.get(name)
+        if i is None:
+            raise KeyError(f"Unknown alert {name!r}")
+        if i + 1 >= len(self.offsets):
+            return self.events[:0]
+        return self.events[self.by_alert[self.offsets[i]:self.offsets[i + 1]]]
+
+    def _before(self, found, on):
+        """
+        Events of `found` on or before `on` (default: every one).
+        """
+        if on is None:
+            return found
+        return found[:np.searchsorted(found["day"], day(on), "right")]
+
+    def active_since(self, name, on=None):
+        """
+        Date the alert last started triggering if it is on as of `on`, else None.
+        """
+        found = self._before(self.alert_events(name), on)
+        if not len(found) or found["edge"][-1] < 0:
+            return None
+        return date_of(found["day"][-1])
+
+    def last_triggered(self, name, on=None):
+        """
+        Date of the alert's latest trigger on or before `on`, or None.
+        """
+        found = self._before(self.alert_events(name), on)
+        rising = found[found["edge"] > 0]
+        return date_of(rising["day"][-1]) if len(rising) else None
+
+    def count_triggers(self, name, start=None, end=None):
+        """
+        Times the alert started triggering between `start` and `end`, inclusive.
+        """
+        found = self.alert_events(name)
+        found = found[found["edge"] > 0]["day"]
+        lo = 0 if start is None else np.searchsorted(found, day(start), "left")
+        hi = len(found) if end is None else np.searchsorted(found, day(end), "right")
+        return int(max(hi - lo, 0))
+
+    def between(self, start=None, end=None, names=None):
+        """
+        Events between `start` and `end` (inclusive) as a (date, alert,
+        edge) DataFrame, optionally only for `names`.
+        """
+        days = self.events["day"]
+        lo = 0 if start is None else np.searchsorted(days, day(start), "left")
+        hi = len(days) if end is None else np.searchsorted(days, day(end), "right")
+        found = self.events[lo:hi]
+        if names is not None:
+            found = found[np.isin(found["alert"], [self.registry[n] for n in names])]
+        name_of = {i: n for n, i in self.registry.items()}
+        return pd.DataFrame({
+            "date": pd.to_datetime(found["day"].astype("datetime64[D]")),
+            "alert": [name_of[int(i)] for i in found["alert"]],
+            "edge": [EDGES[int(e)] for e in found["edge"]],
+        })
+
+
+def date_of(value):
+    return pd.Timestamp(sidecar.date_of(value))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="rebuild the log from the stored alert history")
+    for name, help_ in (("show", "print events in a date range"), ("status", "active since, last trigger and trigger count per alert")):
+        cmd = sub.add_parser(name, help=help_)
+        cmd.add_argument("--start")
+        cmd.add_argument("--end")
+        cmd.add_argument("alerts", nargs="*", metavar="ALERT")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        rows = build()
+        print(f"✅ Alert event log rebuilt — {rows} events through {read_meta()['through']}")
+        return
+
+    log = EventLog()
+    if args.command == "show":
+        frame = log.between(args.start, args.end, args.alerts or None)
+        print(frame.to_string(index=False) if not frame.empty else "ℹ️  No alert events in that range")
+        return
+
+    print(f"ℹ️  As of {log.through.date()}; triggers counted from {args.start or 'the start'} to {args.end or 'the end'}")
+    for name in args.alerts or list(log.registry):
+        since, last = log.active_since(name, args.end), log.last_triggered(name, args.end)
+        status = f"active since {since.date()}" if since is not None else "inactive"
+        last = last.date() if last is not None else "never"
+        print(f"  {name:<20} {status:<24} last triggered {last}, {log.count_triggers(name, args.start, args.end)} triggers")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+"""
+Offline benchmark suite.
+
+Generates a synthetic universe (random-walk OHLCV bars on a business-day
+calendar, mean-reverting levels for VIX) in a throwaway working directory
+and times the main stages against it:
+
+  evaluate    live alert evaluation (indicators.evaluate_latest)
+  backfill    weekly alert matrix + classification over the full history
+              (backfill_history.evaluate_history)
+  parallel    the same on a process pool over shared memory
+              (parallel_backfill.evaluate_history), with its scaling over
+              the same pool on one worker and its speedup over the serial
+              backfill: all three warmed up once, then timed in turn and
+              compared by their medians
+  summarize   full monthly/quarterly summaries of a weekly state history
+  narrate     narratives for those summaries
+
+The first six symbols are the configured ones, so the state rules apply as
+usual; every further symbol gets a copy of one of the configured alerts.
+
+Each stage reports seconds (best of --repeat), throughput and peak traced
+memory. Pool startup outweighs the work at small scales, so scaling is
+only reported unless --min-scaling is given; gate on it at a scale where
+the pool pays off (e.g. --symbols 200 --years 20). --save-baseline stores the results in data/bench/baseline.json
+under the scale key (e.g. "10x5y"); later runs at that scale fail if
+throughput drops, or memory grows, by more than --tolerance.
+
+Usage:
+    python scripts/benchmark.py [--symbols N] [--years Y] [--repeat R]
+                                [--workers W] [--min-scaling X]
+                                [--tolerance T] [--save-baseline]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import backfill_history
+import narrate_summaries
+import parallel_backfill
+import price_store
+import summarize_history
+import trading_calendar
+from indicators import ALERTS, evaluate_latest, load_prices, symbols
+
+BASELINE_FILE = Path("data/bench/baseline.json").resolve()
+
+SESSIONS_PER_YEAR = 252
+END_DATE = "2025-12-31"
+SEED = 20240101
+
+# Daily drift and volatility of the synthetic random walks.
+DRIFT = 0.0003
+VOLATILITY = {"ARKK": 0.025, "QQQ": 0.014}
+DEFAULT_VOLATILITY = 0.011
+
+
+def random_walk(rng, sessions, volatility):
+    returns = rng.normal(DRIFT, volatility, sessions)
+    return 100 * np.exp(np.cumsum(returns))
+
+
+def mean_reverting(rng, sessions, level=18.0, speed=0.05, volatility=1.5):
+    x = np.empty(sessions)
+    x[0] = level
+    shocks = rng.normal(0, volatility, sessions)
+    for i in range(1, sessions):
+        x[i] = max(x[i - 1] + speed * (level - x[i - 1]) + shocks[i], 9.0)
+    return x
+
+
+def synthetic_bars(symbol, sessions, rng):
+    dates = pd.bdate_range(end=END_DATE, periods=sessions)
+    if symbol == "VIX":
+        close = mean_reverting(rng, sessions)
+    else:
+        close = random_walk(rng, sessions, VOLATILITY.get(symbol, DEFAULT_VOLATILITY))
+
+    spread = np.abs(rng.normal(0, 0.005, sessions)) * close
+    open_ = np.r_[close[0], close[:-1]]
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": open_,
+        "High": np.maximum(open_, close) + spread,
+        "Low": np.minimum(open_, close) - spread,
+        "Close": close,
+        "Volume": rng.integers(1_000_000, 50_000_000, sessions),
+    })
+
+
+def synthetic_spec(n_symbols):
+    """
+    The configured alerts plus one copied alert per extra symbol.
+    """
+    specs = list(ALERTS)
+    for i in range(n_symbols - len(symbols(ALERTS))):
+        template = ALERTS[i % len(ALERTS)]
+        name = f"SYN{i:05d}"
+        specs.append(dict(template, symbol=name, alert=f"{name}_{template['alert']}"))
+    return specs
+
+
+def generate(specs, years):
+    sessions = years * SESSIONS_PER_YEAR
+    for i, symbol in enumerate(symbols(specs)):
+        rng = np.random.default_rng(SEED + i)
+        price_store.write(symbol, synthetic_bars(symbol, sessions, rng))
+    return sessions
+
+
+def synthetic_history(weeks, seed=SEED):
+    """
+    A weekly state history with multi-week regimes.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(end=END_DATE, periods=weeks, freq="W-FRI")
+    states, severities = [], []
+    state = "NOMINAL"
+    for _ in range(weeks):
+        if rng.random() < 0.08:
+            state = rng.choice(["NOMINAL", "DOWNTURN", "RECOVERY"])
+        states.append(state)
+        severities.append(0 if state == "NOMINAL" else int(rng.integers(0, 4)))
+    return [
+        {"date": d.strftime("%Y-%m-%d"), "state": s, "severity": str(v)}
+        for d, s, v in zip(dates, states, severities)
+    ]
+
+
+def measure(func, repeat):
+    """
+    Best wall time over `repeat` runs, then one run under tracemalloc for
+    the peak. Returns (seconds, peak_kb, result).
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func()
+        best = min(best, time.perf_counter() - started)
+
+    tracemalloc.start()
+    result = func()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return best, peak // 1024, result
+
+
+def interleaved(funcs, repeat):
+    """
+    Median wall time of each of {name: func} after one warm-up run of each,
+    timing them in turn so all see the same cache and load.
+    """
+    for func in funcs.values():
+        func()
+    times = {name: [] for name in funcs}
+    for _ in range(max(repeat, 1)):
+        for name, func in funcs.items():
+            started = time.perf_counter()
+            func()
+            times[name].append(time.perf_counter() - started)
+    return {name: float(np.median(t)) for name, t in times.items()}
+
+
+def run(n_symbols, years, repeat, workers=None):
+    specs = synthetic_spec(n_symbols)
+    results = {}
+
+    sessions = generate(specs, years)
+    bars = sessions * len(symbols(specs))
+
+    seconds, peak, _ = measure(lambda: evaluate_latest(specs, workers=workers), repeat)
+    results["evaluate"] = {"seconds": seconds, "peak_kb": peak, "bars_per_sec": bars / seconds}
+
+    prices = load_prices(specs)
+    first = max(df["Date"].iloc[0] for df in prices.values())
+    fridays = pd.DatetimeIndex(trading_calendar.anchors(first, END_DATE, "weekly"))
+    seconds, peak, _ = measure(lambda: backfill_history.evaluate_history(fridays, specs), repeat)
+    results["backfill"] = {
+        "seconds": seconds,
+        "peak_kb": peak,
+        "weeks_per_sec": len(fridays) / seconds,
+        "bars_per_sec": bars / seconds,
+    }
+
+    workers = workers or os.cpu_count() or 1
+    parallel = lambda: parallel_backfill.evaluate_history(fridays, specs, workers=workers)
+    medians = interleaved({
+        "serial": lambda: backfill_history.evaluate_history(fridays, specs),
+        "one_worker": lambda: parallel_backfill.evaluate_history(fridays, specs, workers=1),
+        "parallel": parallel,
+    }, repeat)
+    seconds = medians["parallel"]
+    _, peak, _ = measure(parallel, 0)
+    results["parallel"] = {
+        "seconds": seconds,
+        "peak_kb": peak,
+        "weeks_per_sec": len(fridays) / seconds,
+        "bars_per_sec": bars / seconds,
+        "workers": workers,
+        "serial_seconds": medians["serial"],
+        "one_worker_seconds": medians["one_worker"],
+        "speedup": medians["serial"] / seconds,
+        "scaling": medians["one_worker"] / seconds,
+    }
+
+    history = synthetic_history(len(fridays))
+    seconds, peak, (monthly, quarterly, _, _) = measure(
+        lambda: summarize_history.update(history, (None, None, None)), repeat
+    )
+    results["summarize"] = {"seconds": seconds, "peak_kb": peak, "weeks_per_sec": len(history) / seconds}
+
+    seconds, peak, _ = measure(lambda: narrate_summaries.narrate(monthly, quarterly), repeat)
+    periods = len(monthly) + len(quarterly)
+    results["narrate"] = {"seconds": seconds, "peak_kb": peak, "periods_per_sec": periods / seconds}
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Regressions against the baseline: throughput below (1 - tolerance) of
+    it, or peak memory above (1 + tolerance).
+    """
+    failures = []
+    for stage, metrics in baseline.items():
+        current = results.get(stage)
+        if current is None:
+            continue
+        for metric, expected in metrics.items():
+            if metric.endswith("_per_sec") and current[metric] < expected * (1 - tolerance):
+                failures.append(f"{stage} {metric}: {current[metric]:,.0f} < {expected:,.0f}")
+            if metric == "peak_kb" and current[metric] > expected * (1 + tolerance):
+                failures.append(f"{stage} {metric}: {current[metric]:,} > {expected:,}")
+    return failures
+
+
+def load_baseline(path=BASELINE_FILE):
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--symbols", type=int, default=10, help="universe size (default 10)")
+    parser.add_argument("--years", type=int, default=5, help="years of daily sessions (default 5)")
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (default 3)")
+    parser.add_argument("--workers", type=int, help="process pool size for evaluate and parallel (default: all cores)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression (default 0.25)")
+    parser.add_argument("--min-scaling", type=float, help="fail if the parallel backfill on --workers is less than this many times faster than on one worker (default: report only)")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args()
+
+    if args.symbols < len(symbols(ALERTS)):
+        parser.error(f"--symbols must be at least {len(symbols(ALERTS))}")
+
+    scale = f"{args.symbols}x{args.years}y"
+    print(f"🔍 Benchmarking {args.symbols} symbols x {args.years} years")
+
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory(prefix="market-bench-") as workdir:
+        os.chdir(workdir)
+        try:
+            results = run(args.symbols, args.years, args.repeat, args.workers)
+        finally:
+            os.chdir(cwd)
+
+    for stage, metrics in results.items():
+        rates = "  ".join(f"{k}={v:,.0f}" for k, v in metrics.items() if k.endswith("_per_sec"))
+        print(f"⏱️  {stage:<10} {metrics['seconds']:8.3f}s  {metrics['peak_kb']:>9,} KiB  {rates}")
+    parallel = results["parallel"]
+    print(f"ℹ️  Parallel backfill on {parallel['workers']} workers: {parallel['scaling']:.2f}x one worker, "
+          f"{parallel['speedup']:.2f}x the serial backfill (medians {parallel['one_worker_seconds']:.3f}s / "
+          f"{parallel['seconds']:.3f}s / serial {parallel['serial_seconds']:.3f}s)")
+    if args.min_scaling is not None:
+        if parallel["workers"] == 1:
+            print("⚠️  --min-scaling needs more than one worker; not checked")
+        elif parallel["scaling"] < args.min_scaling:
+            print(f"❌ Parallel backfill scales {parallel['scaling']:.2f}x, below {args.min_scaling:.2f}x")
+            sys.exit(1)
+
+    baselines = load_baseline()
+    if args.save_baseline:
+        baselines[scale] = results
+        BASELINE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        with open(BASELINE_FILE, "w") as f:
+            json.dump(baselines, f, indent=2)
+        print(f"✅ Baseline saved for {scale}")
+        return
+
+    if scale not in baselines:
+        print(f"ℹ️  No baseline for {scale}; run with --save-baseline to record one")
+        return
+
+    failures = compare(results, baselines[scale], args.tolerance)
+    for failure in failures:
+        print(f"❌ Regression: {failure}")
+    if failures:
+        sys.exit(1)
+    print(f"✅ Within {args.tolerance:.0%} of the {scale} baseline")
+
+
+if __name__ == "__main__":
+    main()
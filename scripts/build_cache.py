@@ -0,0 +1,123 @@
+"""
+Content-hash build cache.
+
+data/cache/manifest.json records, for each pipeline stage, a hash of the
+stage's inputs and of every output it wrote. A stage is fresh (and can be
+skipped) when its input hash matches and its outputs are still on disk with
+the recorded content. Outputs are only rewritten when their bytes change.
+
+Usage:
+    python scripts/build_cache.py show
+    python scripts/build_cache.py clear [STAGE ...]   # force recomputation
+"""
+
+import hashlib
+import json
+import sys
+from pathlib import Path
+
+import instrument
+
+MANIFEST = Path("data/cache/manifest.json")
+
+
+def digest(*parts):
+    """
+    Stable sha256 over bytes, strings, paths (file contents) and
+    JSON-serializable values.
+    """
+    h = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, Path):
+            h.update(file_digest(part).encode())
+        elif isinstance(part, bytes):
+            h.update(part)
+        elif isinstance(part, str):
+            h.update(part.encode())
+        else:
+            h.update(json.dumps(part, sort_keys=True, default=str).encode())
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def file_digest(path):
+    path = Path(path)
+    if not path.exists():
+        return "missing"
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def load_manifest(path=MANIFEST):
+    if not Path(path).exists():
+        return {"stages": {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_manifest(manifest, path=MANIFEST):
+    write_if_changed(path, json.dumps(manifest, indent=2, sort_keys=True))
+
+
+def write_if_changed(path, data):
+    """
+    Write `data` (str or bytes) to `path` unless the file already holds
+    exactly those bytes. Returns True if the file was written.
+    """
+    path = Path(path)
+    if isinstance(data, str):
+        data = data.encode()
+    if path.exists() and path.stat().st_size == len(data) and path.read_bytes() == data:
+        return False
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data)
+    tmp.replace(path)
+    instrument.add(files_written=1, bytes_written=len(data))
+    return True
+
+
+def is_fresh(manifest, stage, key):
+    entry = manifest["stages"].get(stage)
+    if not entry or entry["inputs"] != key:
+        return False
+    return all(file_digest(p) == h for p, h in entry["outputs"].items())
+
+
+def record(manifest, stage, key, outputs):
+    manifest["stages"][stage] = {
+        "inputs": key,
+        "outputs": {str(p): file_digest(p) for p in outputs},
+    }
+
+
+def invalidate(manifest, stages=None):
+    if not stages:
+        manifest["stages"] = {}
+    for stage in stages or []:
+        manifest["stages"].pop(stage, None)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("show", "clear"):
+        print(__doc__)
+        return
+
+    manifest = load_manifest()
+    if argv[0] == "show":
+        for stage, entry in sorted(manifest["stages"].items()):
+            fresh = "fresh" if is_fresh(manifest, stage, entry["inputs"]) else "stale"
+            print(f"{stage:<10} {entry['inputs'][:12]}  {fresh}")
+        return
+
+    invalidate(manifest, argv[1:])
+    save_manifest(manifest)
+    print(f"✅ Cache cleared: {', '.join(argv[1:]) or 'all stages'}")
+
+
+if __name__ == "__main__":
+    main()
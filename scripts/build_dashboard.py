@@ -0,0 +1,116 @@
+"""
+Dashboard data bundle.
+
+Packs everything docs/index.html shows into one compact JSON file:
+
+  snapshot    state_snapshot.json as-is
+  recent      the last RECENT_ROWS history rows, [date, state, severity]
+  older       everything before that, run-length encoded as
+              [first date, last date, state, max severity, rows]
+  quarterly   the latest quarterly narrative
+
+The file is named after a hash of its content (data/bundle.<hash>.json)
+and written next to .gz and, if the brotli package is installed, .br
+copies for hosts that serve precompressed files. index.html is pointed at
+the new name, so browsers can cache a bundle forever and still pick up the
+next one. Bundles from earlier runs are removed.
+
+Usage:
+    python scripts/build_dashboard.py
+"""
+
+import gzip
+import hashlib
+import json
+import re
+from pathlib import Path
+
+import history_store
+from build_cache import write_if_changed
+
+OUTPUT = Path("data/output")
+DOCS = Path("docs")
+DOCS_DATA = DOCS / "data"
+INDEX_HTML = DOCS / "index.html"
+
+RECENT_ROWS = 52
+
+BUNDLE_REF = re.compile(r"const BUNDLE = '[^']*';")
+
+
+def load_json(path):
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def run_length(rows):
+    runs = []
+    for r in rows:
+        severity = int(r["severity"])
+        if runs and runs[-1][2] == r["state"]:
+            run = runs[-1]
+            run[1] = r["date"]
+            run[3] = max(run[3], severity)
+            run[4] += 1
+        else:
+            runs.append([r["date"], r["date"], r["state"], severity, 1])
+    return runs
+
+
+def build_bundle(snapshot, history, narratives):
+    split = max(len(history) - RECENT_ROWS, 0)
+    latest = max(narratives) if narratives else None
+    return {
+        "version": 1,
+        "snapshot": snapshot,
+        "recent": [[r["date"], r["state"], int(r["severity"])] for r in history[split:]],
+        "older": run_length(history[:split]),
+        "quarterly": {"period": latest, "text": narratives[latest]["text"]} if latest else None,
+    }
+
+
+def compress(data):
+    """
+    Precompressed copies of `data` by file suffix.
+    """
+    copies = {".gz": gzip.compress(data, compresslevel=9, mtime=0)}
+    try:
+        import brotli
+    except ImportError:
+        print("ℹ️  brotli not installed; skipping .br bundle")
+    else:
+        copies[".br"] = brotli.compress(data, quality=11)
+    return copies
+
+
+def write_bundle(bundle, out_dir=DOCS_DATA, index_html=INDEX_HTML):
+    data = json.dumps(bundle, separators=(",", ":")).encode()
+    name = f"bundle.{hashlib.sha256(data).hexdigest()[:12]}.json"
+
+    write_if_changed(out_dir / name, data)
+    for suffix, payload in compress(data).items():
+        write_if_changed(out_dir / (name + suffix), payload)
+
+    for old in out_dir.glob("bundle.*.json*"):
+        if not old.name.startswith(name):
+            old.unlink()
+
+    html = index_html.read_text()
+    write_if_changed(index_html, BUNDLE_REF.sub(f"const BUNDLE = './data/{name}';", html))
+    return name, len(data)
+
+
+def main():
+    bundle = build_bundle(
+        load_json(OUTPUT / "state_snapshot.json"),
+        history_store.scan(),
+        load_json(OUTPUT / "quarterly_narrative.json") or {},
+    )
+    name, size = write_bundle(bundle)
+    print(f"✅ Dashboard bundle written — {name} ({size} bytes)")
+
+
+if __name__ == "__main__":
+    main()
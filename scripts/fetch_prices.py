@@ -1,39 +1,157 @@
 # src/fetch_market_data.py
 
+import io
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.parse import urlparse
+
 import pandas as pd
 from pathlib import Path
 
-# Stooq base URL for most symbols; VIX will be fetched via yfinance instead.
-BASE_URL = "https://stooq.com/q/d/l/"
-SYMBOLS = {
-    "SPY": "spy.us",
-    "QQQ": "qqq.us",
-    "ARKK": "arkk.us",
-    "HYG": "hyg.us",
-    "IEF": "ief.us",
-}
+import http_client
+import instrument
+import price_store
+from indicators import UNIVERSE
+
+# Stooq base URL for most symbols; the rest (VIX) are fetched via yfinance.
+# STOOQ_BASE_URL points the fetcher at a local stand-in for offline runs.
+BASE_URL = os.environ.get("STOOQ_BASE_URL", "https://stooq.com/q/d/l/")
+
+# Symbol -> source ticker, from config/universe.json
+SYMBOLS = {s: c["code"] for s, c in UNIVERSE.items() if c["source"] == "stooq"}
+YFINANCE_SYMBOLS = {s: c["code"] for s, c in UNIVERSE.items() if c["source"] == "yfinance"}
 
-# VIX ticker for yfinance
-VIX_SYMBOL = "^VIX"
+# Incremental fetches re-request this many calendar days before the last
+# stored date, so revised closes in the overlap are caught and rewritten,
+# and a rescaled overlap (a dividend back-adjustment) triggers a full fetch.
+OVERLAP_DAYS = 10
+
+# Concurrency and retry policy. Each host gets its own concurrency cap so a
+# slow or rate-limited source cannot starve the others.
+MAX_WORKERS = 8
+HOST_CONCURRENCY = {
+    "stooq.com": 2,
+    "yfinance": 1,
+}
+DEFAULT_HOST_CONCURRENCY = 4
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+SYMBOL_TIMEOUT = 60  # seconds, across all attempts for one symbol
+REQUEST_TIMEOUT = 20  # seconds, per attempt
 
 RAW_DIR = Path("data/raw")
 RAW_DIR.mkdir(parents=True, exist_ok=True)
 
+_slots_lock = threading.Lock()
+_host_slots = {}
+
+
+def host_slot(host: str) -> threading.BoundedSemaphore:
+    with _slots_lock:
+        if host not in _host_slots:
+            limit = HOST_CONCURRENCY.get(host, DEFAULT_HOST_CONCURRENCY)
+            _host_slots[host] = threading.BoundedSemaphore(limit)
+        return _host_slots[host]
+
+
+def with_retries(call, host: str, deadline: float):
+    """
+    Run `call(timeout)` under the host's concurrency cap, retrying with
+    exponential backoff until it succeeds, RETRIES is exhausted or the
+    symbol's deadline passes.
+    """
+    return http_client.with_retries(
+        call, RETRIES, BACKOFF_SECONDS, REQUEST_TIMEOUT, deadline, host_slot(host)
+    )
+
+
+def http_get(url: str, deadline: float) -> bytes:
+    def call(timeout):
+        return http_client.check(http_client.session().get(url, timeout=timeout)).content
+
+    return with_retries(call, urlparse(url).hostname or "", deadline)
 
-def fetch(symbol: str, stooq_code: str) -> None:
+
+def fetch_start(symbol: str, full: bool = False):
     """
-    Fetch a single equity/ETF from Stooq and write it to CSV.
+    First date to request for `symbol`, or None for the full history.
     """
+    if full:
+        return None
+
+    # Seed the store from the checked-in CSV the first time round.
+    if price_store.read_meta(symbol) is None and (RAW_DIR / f"{symbol}.csv").exists():
+        price_store.import_csv(symbol)
+
+    last = price_store.last_date(symbol)
+    if last is None:
+        return None
+    return (last - timedelta(days=OVERLAP_DAYS)).date()
+
+
+def stooq_url(stooq_code: str, start=None) -> str:
     url = f"{BASE_URL}?s={stooq_code}&i=d"
+    if start is not None:
+        url += f"&d1={start:%Y%m%d}&d2={date.today():%Y%m%d}"
+    return url
+
+
+def store(symbol: str, df: pd.DataFrame, start):
+    """
+    Merge fetched bars into the price store and return the number of rows
+    written. Returns None when an incremental fetch does not reach back to
+    the last stored session, or when the provider has back-adjusted the
+    history (see price_store.back_adjusted), in which case nothing is
+    written and the caller should fetch in full. A full fetch replaces the
+    stored history.
+    """
+    last = price_store.last_date(symbol)
+    if start is not None and last is not None and df["Date"].iloc[0] > last:
+        print(f"⚠️  {symbol}: incremental fetch does not overlap stored data")
+        return None
+    if start is not None and price_store.back_adjusted(symbol, df):
+        print(f"⚠️  {symbol}: history was back-adjusted; refetching in full")
+        return None
+
+    if start is None and last is not None:
+        # A full fetch is the provider's current scale for every bar.
+        added = price_store.write(symbol, df)
+        print(f"✅ Fetched {symbol} ({added} rows written, full history replaced)")
+        return added
+
+    revised, added = price_store.merge(symbol, df)
+    note = f", {revised} revised" if revised else ""
+    print(f"✅ Fetched {symbol} ({added} rows written{note})")
+    return added
+
+
+def fetch(symbol: str, stooq_code: str, full: bool = False) -> dict:
+    """
+    Fetch a single equity/ETF from Stooq and merge it into the price store.
+    Only the sessions since the last stored date (plus an overlap window)
+    are requested unless `full` is set.
+
+    Returns per-symbol stats: latency, bytes transferred, rows written and
+    any error.
+    """
+    stats = {"symbol": symbol, "seconds": 0.0, "bytes": 0, "rows": 0, "error": None}
+    started = time.monotonic()
     try:
-        df = pd.read_csv(url)
+        start = fetch_start(symbol, full)
+        content = http_get(stooq_url(stooq_code, start), started + SYMBOL_TIMEOUT)
+        stats["bytes"] = len(content)
+        df = pd.read_csv(io.BytesIO(content))
 
         # Normalize column names
         df.columns = [c.strip().capitalize() for c in df.columns]
 
         if "Date" not in df.columns:
             print(f"⚠️  Skipping {symbol}: no Date column returned")
-            return
+            return stats
 
         df["Date"] = pd.to_datetime(df["Date"], errors="coerce")
         df = df.dropna(subset=["Date"])
@@ -41,46 +159,125 @@ def fetch(symbol: str, stooq_code: str) -> None:
 
         if df.empty:
             print(f"⚠️  Skipping {symbol}: no valid rows")
-            return
+            return stats
 
-        df.to_csv(RAW_DIR / f"{symbol}.csv", index=False)
-        print(f"✅ Fetched {symbol}")
+        stats["rows"] = store(symbol, df, start)
+        if stats["rows"] is None:
+            retry = fetch(symbol, stooq_code, full=True)
+            stats["bytes"] += retry["bytes"]
+            stats["rows"] = retry["rows"]
+            stats["error"] = retry["error"]
 
     except Exception as e:
+        stats["error"] = str(e)
         print(f"❌ Error fetching {symbol}: {e}")
 
+    finally:
+        stats["seconds"] = time.monotonic() - started
 
-def main() -> None:
-    # First, fetch all symbols supported on Stooq
-    for symbol, code in SYMBOLS.items():
-        fetch(symbol, code)
+    return stats
 
-    # Next, fetch VIX via yfinance
-    try:
-        import yfinance as yf
-
-        print(f"🔍 Downloading VIX data from yfinance ({VIX_SYMBOL})")
-        vix = yf.Ticker(VIX_SYMBOL)
-        df_vix = vix.history(period="max").reset_index()
-
-        if "Date" not in df_vix.columns:
-            print("⚠️  Skipping VIX: no Date column returned from yfinance")
-        else:
-            # Normalize to Stooq-style six-column format:
-            #   Date, Open, High, Low, Close, Volume
-            df_vix["Date"] = (
-                pd.to_datetime(df_vix["Date"], errors="coerce")
-                .dt.tz_localize(None)
-                .dt.date
-            )
-            df_vix = df_vix.dropna(subset=["Date"])
-            df_vix = df_vix[["Date", "Open", "High", "Low", "Close", "Volume"]]
-            df_vix.sort_values("Date", inplace=True)
-            df_vix.to_csv(RAW_DIR / "VIX.csv", index=False)
-            print("✅ Fetched VIX")
 
+def export_csv() -> None:
+    """
+    Write every stored symbol back out to data/raw/<SYMBOL>.csv.
+    """
+    for symbol in price_store.symbols():
+        price_store.export_csv(symbol, RAW_DIR)
+    print("✅ Raw CSVs exported")
+
+
+def fetch_yfinance(symbol: str, ticker: str, full: bool = False) -> dict:
+    """
+    Fetch a symbol via yfinance and merge it into the price store. yfinance
+    manages its own HTTP session, so bytes transferred are not reported.
+    """
+    stats = {"symbol": symbol, "seconds": 0.0, "bytes": None, "rows": 0, "error": None}
+    started = time.monotonic()
+    try:
+        stats["rows"] = download_yfinance(symbol, ticker, full, started + SYMBOL_TIMEOUT)
     except Exception as e:
-        print(f"❌ Error fetching VIX from yfinance: {e}")
+        stats["error"] = str(e)
+        print(f"❌ Error fetching {symbol} from yfinance: {e}")
+    finally:
+        stats["seconds"] = time.monotonic() - started
+    return stats
+
+
+def download_yfinance(symbol: str, ticker: str, full: bool, deadline: float) -> int:
+    import yfinance as yf
+
+    start = fetch_start(symbol, full)
+    print(f"🔍 Downloading {symbol} data from yfinance ({ticker})")
+    source = yf.Ticker(ticker)
+
+    def call(timeout):
+        if start is None:
+            return source.history(period="max", timeout=timeout, raise_errors=True)
+        return source.history(start=start.isoformat(), timeout=timeout, raise_errors=True)
+
+    df = with_retries(call, "yfinance", deadline).reset_index()
+
+    if "Date" not in df.columns:
+        print(f"⚠️  Skipping {symbol}: no Date column returned from yfinance")
+        return 0
+
+    # Normalize to Stooq-style six-column format:
+    #   Date, Open, High, Low, Close, Volume
+    df["Date"] = (
+        pd.to_datetime(df["Date"], errors="coerce")
+        .dt.tz_localize(None)
+        .dt.normalize()
+    )
+    df = df.dropna(subset=["Date"])
+    df = df[["Date", "Open", "High", "Low", "Close", "Volume"]]
+    df.sort_values("Date", inplace=True)
+
+    if df.empty:
+        print(f"⚠️  Skipping {symbol}: no valid rows")
+        return 0
+
+    written = store(symbol, df, start)
+    if written is None:
+        return download_yfinance(symbol, ticker, True, deadline)
+    return written
+
+
+def report(results: list) -> None:
+    for r in results:
+        size = "n/a" if r["bytes"] is None else f"{r['bytes'] / 1024:.1f} KB"
+        status = "failed" if r["error"] else "ok"
+        print(f"⏱️  {r['symbol']:<6} {r['seconds']:6.2f}s  {size:>10}  {status}")
+
+
+def traced(func, symbol, *args) -> dict:
+    with instrument.span(f"fetch:{symbol}"):
+        stats = func(symbol, *args)
+        instrument.add(rows=stats["rows"] or 0, bytes_read=stats["bytes"] or 0)
+    return stats
+
+
+def fetch_all(full: bool = False) -> list:
+    # Stooq and yfinance symbols are fetched concurrently; each symbol's
+    # errors stay with that symbol.
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        futures = [
+            pool.submit(traced, fetch, symbol, code, full)
+            for symbol, code in SYMBOLS.items()
+        ]
+        futures += [
+            pool.submit(traced, fetch_yfinance, symbol, ticker, full)
+            for symbol, ticker in YFINANCE_SYMBOLS.items()
+        ]
+        return [f.result() for f in futures]
+
+
+def main() -> None:
+    results = fetch_all("--full" in sys.argv[1:])
+    report(results)
+
+    if "--export-csv" in sys.argv[1:]:
+        export_csv()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,370 @@
+"""
+Indexed state history.
+
+data/history/state_history.csv stays the record, one row per date in date
+order. Next to it:
+
+  state_history.idx        one fixed-width (day, byte offset) record per row
+  state_history.meta.json  row count, CSV size and modification time, the
+                           last row and the current streak of its state,
+                           and a generation token that changes whenever
+                           stored rows are rewritten (appends keep it)
+
+The last row and the current streak are read from the meta alone. Range
+scans bisect the index and read only the CSV bytes they cover; timeline()
+wraps a scan in the run-length view of timeline.py. Writes are upserts
+keyed by date: a newer date is appended, an existing date is replaced in
+place, and an older date rewrites the file from that row on. meta.json is
+written last, so an interrupted write is repaired on the next open. A CSV
+that no longer matches its meta (edited by hand, say) is re-indexed, sorted
+by date with one row per date.
+
+Usage:
+    python scripts/history_store.py rebuild
+    python scripts/history_store.py export PATH [--start DATE] [--end DATE] [--last N]
+"""
+
+import argparse
+import bisect
+import csv
+import mmap
+import io
+import secrets
+import struct
+from itertools import accumulate
+from pathlib import Path
+
+import instrument
+import sidecar
+from sidecar import day
+
+HISTORY_FILE = Path("data/history/state_history.csv")
+
+FIELDS = ["date", "state", "severity"]
+# One index record per row: (days since 1970-01-01, byte offset in the CSV)
+INDEX_RECORD = struct.Struct("<qq")
+
+
+def index_file(path=HISTORY_FILE):
+    return Path(path).with_suffix(".idx")
+
+
+def meta_file(path=HISTORY_FILE):
+    return Path(path).with_suffix(".meta.json")
+
+
+def normalize(row):
+    return {k: str(row[k]) for k in FIELDS}
+
+
+def encode(rows, header=False):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=FIELDS)
+    if header:
+        writer.writeheader()
+    for row in rows:
+        writer.writerow(normalize(row))
+    return buf.getvalue().encode()
+
+
+def decode(data):
+    return [dict(zip(FIELDS, values)) for values in csv.reader(io.StringIO(data.decode())) if values]
+
+
+def read_meta(path=HISTORY_FILE):
+    return sidecar.read_json(meta_file(path))
+
+
+def write_meta(meta, path=HISTORY_FILE):
+    sidecar.write_json(meta_file(path), meta)
+
+
+def consistent(meta, path=HISTORY_FILE):
+    path = Path(path)
+    if meta is None or not path.exists():
+        return False
+    stat = path.stat()
+    if stat.st_size != meta["bytes"] or stat.st_mtime_ns != meta.get("mtime_ns"):
+        return False
+    idx = index_file(path)
+    if not idx.exists() or idx.stat().st_size < meta["rows"] * INDEX_RECORD.size:
+        return False
+    if meta["rows"] == 0:
+        return True
+    with open(path, "rb") as f:
+        f.seek(meta["last_offset"])
+        return f.read() == encode([meta["last"]])
+
+
+def write(rows, path=HISTORY_FILE):
+    """
+    Replace the history with `rows`, sorted by date and keeping the last
+    row given for each date.
+    """
+    by_day = {day(r["date"]): normalize(r) for r in rows}
+    days = sorted(by_day)
+    rows = [by_day[d] for d in days]
+
+    header = encode([], header=True)
+    lines = [encode([r]) for r in rows]
+    offsets = list(accumulate([len(header)] + [len(line) for line in lines]))
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(header + b"".join(lines))
+    index_file(path).write_bytes(index_records(days, offsets))
+
+    meta = {
+        "rows": len(rows),
+        "bytes": offsets[-1],
+        "mtime_ns": path.stat().st_mtime_ns,
+        "generation": secrets.token_hex(8),
+        "last_offset": offsets[-2] if rows else None,
+        "last": rows[-1] if rows else None,
+        "run": streak(rows),
+    }
+    write_meta(meta, path)
+    return meta
+
+
+def index_records(days, offsets):
+    return b"".join(INDEX_RECORD.pack(d, o) for d, o in zip(days, offsets))
+
+
+def rebuild(path=HISTORY_FILE):
+    rows = []
+    if Path(path).exists():
+        with open(path, newline="") as f:
+            rows = [normalize(r) for r in csv.DictReader(f)]
+    return write(rows, path)
+
+
+def open_meta(path=HISTORY_FILE):
+    meta = read_meta(path)
+    if not consistent(meta, path):
+        meta = rebuild(path)
+    return meta
+
+
+class Index:
+    """
+    The index records of the first `rows` rows, memory-mapped and unpacked
+    one at a time.
+    """
+
+    def __init__(self, rows, path=HISTORY_FILE):
+        self.rows = rows
+        self.map = None
+        if rows:
+            with open(index_file(path), "rb") as f:
+                self.map = mmap.mmap(f.fileno(), rows * INDEX_RECORD.size, access=mmap.ACCESS_READ)
+
+    def day(self, i):
+        return INDEX_RECORD.unpack_from(self.map, i * INDEX_RECORD.size)[0]
+
+    def offset(self, i):
+        return INDEX_RECORD.unpack_from(self.map, i * INDEX_RECORD.size)[1]
+
+    def close(self):
+        if self.map is not None:
+            self.map.close()
+            self.map = None
+
+
+def index(meta, path=HISTORY_FILE):
+    return Index(meta["rows"], path)
+
+
+def position(idx, date, side="left"):
+    find = bisect.bisect_right if side == "right" else bisect.bisect_left
+    return find(range(idx.rows), day(date), key=idx.day)
+
+
+def streak(rows, prior=None):
+    """
+    {state, weeks}: the state of the last of `rows` and how many rows in a
+    row it has held, counting on from `prior` (the streak before them) when
+    every row is in that state. None without rows or prior.
+    """
+    if not rows:
+        return prior
+    state = rows[-1]["state"]
+    weeks = 0
+    for r in reversed(rows):
+        if r["state"] != state:
+            return {"state": state, "weeks": weeks}
+        weeks += 1
+    if prior and prior["state"] == state:
+        weeks += prior["weeks"]
+    return {"state": state, "weeks": weeks}
+
+
+def read_range(meta, idx, lo, hi, path=HISTORY_FILE):
+    """
+    Rows at index positions [lo, hi).
+    """
+    if lo >= hi:
+        return []
+    begin = idx.offset(lo)
+    end = idx.offset(hi) if hi < meta["rows"] else meta["bytes"]
+    instrument.add(rows=hi - lo, bytes_read=end - begin)
+    with open(path, "rb") as f:
+        f.seek(begin)
+        return decode(f.read(end - begin))
+
+
+def last(path=HISTORY_FILE):
+    return open_meta(path)["last"]
+
+
+def run(path=HISTORY_FILE):
+    return open_meta(path)["run"]
+
+
+def before(date, path=HISTORY_FILE):
+    """
+    The last row and the current streak ({state, weeks}) among rows dated
+    before `date`. Served from the meta unless `date` is already recorded.
+    """
+    meta = open_meta(path)
+    if meta["rows"] == 0 or day(meta["last"]["date"]) < day(date):
+        return meta["last"], meta["run"]
+
+    idx = index(meta, path)
+    rows = read_range(meta, idx, 0, position(idx, date), path)
+    return (rows[-1] if rows else None), streak(rows)
+
+
+def generation(row=None, path=HISTORY_FILE):
+    """
+    Token that changes whenever rows already stored are rewritten (appends
+    keep it), as it will be after upsert(row): None if `row` would rewrite
+    stored rows.
+    """
+    meta = open_meta(path)
+    if row is not None and (not meta["rows"] or day(row["date"]) <= day(meta["last"]["date"])):
+        return None
+    return meta.get("generation")
+
+
+def scan(start=None, end=None, path=HISTORY_FILE):
+    """
+    Rows dated within [start, end] (either bound optional).
+    """
+    meta = open_meta(path)
+    idx = index(meta, path)
+    lo = 0 if start is None else position(idx, start)
+    hi = meta["rows"] if end is None else position(idx, end, "right")
+    return read_range(meta, idx, lo, hi, path)
+
+
+def timeline(start=None, end=None, path=HISTORY_FILE):
+    from timeline import Timeline
+
+    return Timeline.from_rows(scan(start, end, path))
+
+
+def tail(n, path=HISTORY_FILE):
+    meta = open_meta(path)
+    return read_range(meta, index(meta, path), max(meta["rows"] - n, 0), meta["rows"], path)
+
+
+def with_row(rows, row):
+    """
+    `rows` as they read after upsert(row), without touching the store.
+    """
+    row = normalize(row)
+    d = day(row["date"])
+    return [r for r in rows if day(r["date"]) < d] + [row] + [r for r in rows if day(r["date"]) > d]
+
+
+def upsert(row, path=HISTORY_FILE):
+    """
+    Record `row`, replacing any row with the same date. Returns True if the
+    history changed.
+    """
+    row = normalize(row)
+    meta = open_meta(path)
+    if meta["rows"] == 0:
+        write([row], path)
+        return True
+
+    d = day(row["date"])
+    if d > day(meta["last"]["date"]):
+        line = encode([row])
+        sidecar.append_at(path, meta["bytes"], line)
+        sidecar.append_at(index_file(path), meta["rows"] * INDEX_RECORD.size, INDEX_RECORD.pack(d, meta["bytes"]))
+
+        same = meta["run"]["state"] == row["state"]
+        meta.update(
+            rows=meta["rows"] + 1,
+            bytes=meta["bytes"] + len(line),
+            mtime_ns=Path(path).stat().st_mtime_ns,
+            last_offset=meta["bytes"],
+            last=row,
+            run={"state": row["state"], "weeks": meta["run"]["weeks"] + 1 if same else 1},
+        )
+        write_meta(meta, path)
+        return True
+
+    idx = index(meta, path)
+    pos = position(idx, row["date"])
+    rows = read_range(meta, idx, pos, meta["rows"], path)
+    if rows and day(rows[0]["date"]) == d:
+        if rows[0] == row:
+            return False
+        rows = [row] + rows[1:]
+    else:
+        rows = [row] + rows
+
+    offset = idx.offset(pos)
+    prev_run = streak(read_range(meta, idx, 0, pos, path))
+    idx.close()
+
+    lines = [encode([r]) for r in rows]
+    sidecar.append_at(path, offset, b"".join(lines))
+    offsets = list(accumulate([offset] + [len(line) for line in lines]))
+    sidecar.append_at(index_file(path), pos * INDEX_RECORD.size, index_records([day(r["date"]) for r in rows], offsets))
+
+    meta.update(
+        rows=pos + len(rows),
+        bytes=offsets[-1],
+        mtime_ns=Path(path).stat().st_mtime_ns,
+        generation=secrets.token_hex(8),
+        last_offset=offsets[-2],
+        last=rows[-1],
+        run=streak(rows, prev_run),
+    )
+    write_meta(meta, path)
+    return True
+
+
+def export(out, start=None, end=None, last_n=None, path=HISTORY_FILE):
+    rows = tail(last_n, path) if last_n else scan(start, end, path)
+    out = Path(out)
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_bytes(encode(rows, header=True))
+    return len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("rebuild", help="re-index the history CSV")
+    exp = sub.add_parser("export", help="write a date range of the history to PATH")
+    exp.add_argument("path")
+    exp.add_argument("--start")
+    exp.add_argument("--end")
+    exp.add_argument("--last", type=int, help="only the last N rows")
+    args = parser.parse_args()
+
+    if args.command == "rebuild":
+        meta = rebuild()
+        print(f"✅ History indexed ({meta['rows']} rows)")
+    else:
+        rows = export(args.path, args.start, args.end, args.last)
+        print(f"✅ Exported {rows} history rows to {args.path}")
+
+
+if __name__ == "__main__":
+    main()
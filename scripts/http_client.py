@@ -0,0 +1,79 @@
+"""
+Shared HTTP plumbing for the fetcher and the notifier.
+
+One pooled requests session per process (requests is imported on first
+use, so the light stages never load it), a status check that separates
+transient failures (network errors, HTTP 429 and 5xx) from permanent ones
+(any other 4xx), and a retry loop with exponential backoff.
+"""
+
+import threading
+import time
+from contextlib import nullcontext
+
+POOL_SIZE = 8
+
+_session = None
+_session_lock = threading.Lock()
+
+
+class PermanentError(Exception):
+    """
+    A failure that retrying cannot fix (e.g. HTTP 401/404/422).
+    """
+
+
+def session():
+    """
+    Shared pooled HTTP session, created on first use.
+    """
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            _session.mount("http://", adapter)
+            _session.mount("https://", adapter)
+        return _session
+
+
+def check(response):
+    """
+    `response` if it succeeded; IOError for 429/5xx, PermanentError for any
+    other error status.
+    """
+    if response.status_code == 429 or response.status_code >= 500:
+        raise IOError(f"HTTP {response.status_code}")
+    if response.status_code >= 400:
+        raise PermanentError(f"HTTP {response.status_code}: {response.text[:200]}")
+    return response
+
+
+def with_retries(call, retries, backoff, timeout, deadline=None, slot=None):
+    """
+    Run `call(timeout)`, retrying anything but PermanentError with
+    exponential backoff until it succeeds, `retries` is exhausted or the
+    monotonic `deadline` passes. Each attempt runs inside `slot` (e.g. a
+    per-host semaphore) and gets at most `timeout` seconds.
+    """
+    for attempt in range(retries + 1):
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("deadline exceeded")
+            timeout = min(timeout, remaining)
+        try:
+            with slot or nullcontext():
+                return call(timeout)
+        except PermanentError:
+            raise
+        except Exception:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                raise
+            time.sleep(delay)
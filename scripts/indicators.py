@@ -0,0 +1,204 @@
+import operator
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import alert_bits
+import instrument
+import price_store
+import trading_calendar
+
+# Config and state rules live in rules.py, which avoids pandas; they are
+# re-exported here for the engine's users.
+from rules import (
+    ALERTS,
+    CONFIG,
+    CONFIG_FILE,
+    DEFAULT_RULES,
+    DOWNTURN_ALERTS,
+    DOWNTURN_ANCHOR,
+    RECOVERY_ALERTS,
+    RECOVERY_ANCHOR,
+    RECOVERY_MIN_ALERTS,
+    UNIVERSE,
+    classify_alerts,
+    load_config,
+    load_profiles,
+)
+
+RAW_DIR = Path("data/raw")
+
+# Process-pool evaluation only pays off once the universe is large.
+PARALLEL_MIN_SYMBOLS = 32
+CHUNKS_PER_WORKER = 4
+
+OPS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+def symbols(specs=ALERTS):
+    return list(dict.fromkeys(s["symbol"] for s in specs))
+
+
+def load(symbol, raw_dir=RAW_DIR):
+    with instrument.span(f"load:{symbol}"):
+        df = price_store.load(symbol, raw_dir=raw_dir)
+    if df is None:
+        print(f"⚠️  Missing data for {symbol}")
+    return df
+
+
+def load_prices(specs=ALERTS, raw_dir=RAW_DIR):
+    """
+    Load every symbol the spec needs, once. Missing symbols are left out.
+    """
+    prices = {}
+    for symbol in symbols(specs):
+        df = load(symbol, raw_dir)
+        if df is not None:
+            prices[symbol] = df
+    return prices
+
+
+def transform(close, name, window=None):
+    if name == "level":
+        return close
+    if name == "ma":
+        return close - close.rolling(window).mean()
+    if name == "pct_from_high":
+        return (close / close.rolling(window).max() - 1) * 100
+    if name == "pct_from_low":
+        return (close / close.rolling(window).min() - 1) * 100
+    raise ValueError(f"Unknown transform: {name}")
+
+
+def column_key(spec):
+    return spec["symbol"], spec["transform"], spec.get("window")
+
+
+def compute_columns(prices, specs=ALERTS):
+    """
+    Compute each distinct (symbol, transform, window) series over the full
+    history of its symbol.
+    """
+    columns = {}
+    with instrument.span("compute_columns"):
+        for spec in specs:
+            key = column_key(spec)
+            if key in columns or spec["symbol"] not in prices:
+                continue
+            symbol, name, window = key
+            columns[key] = transform(prices[symbol]["Close"], name, window)
+        instrument.add(columns=len(columns), rows=sum(len(c) for c in columns.values()))
+    return columns
+
+
+def asof_positions(df, dates):
+    """
+    Row index of the last session on or before each date (-1 if none).
+    """
+    return trading_calendar.asof_index(df["Date"].to_numpy(), pd.DatetimeIndex(dates).to_numpy())
+
+
+def alert_matrix(prices, dates=None, specs=ALERTS):
+    """
+    Evaluate every alert as of each date in `dates` (one row per date).
+
+    Each symbol contributes its last row on or before the date. With no
+    dates, the single row uses the latest row of every symbol, which is the
+    live snapshot. Alerts with no data or too little history are NA.
+    """
+    if dates is None:
+        latest = max((df["Date"].iloc[-1] for df in prices.values()), default=pd.NaT)
+        index = pd.DatetimeIndex([latest])
+    else:
+        index = pd.DatetimeIndex(pd.to_datetime(dates))
+
+    columns = compute_columns(prices, specs)
+    positions = {}
+    for symbol, df in prices.items():
+        if dates is None:
+            positions[symbol] = np.array([len(df) - 1])
+        else:
+            positions[symbol] = asof_positions(df, index)
+
+    matrix = pd.DataFrame(index=index)
+    for spec in specs:
+        key = column_key(spec)
+        if key not in columns:
+            continue
+        pos = positions[spec["symbol"]]
+        values = pd.Series(columns[key].to_numpy()[pos.clip(min=0)], index=index)
+        hit = OPS[spec["op"]](values, spec["threshold"])
+        available = pos + 1 >= spec.get("min_rows", 1)
+        matrix[spec["alert"]] = hit.astype("boolean").where(available)
+
+    return matrix
+
+
+def classify(matrix, rules=DEFAULT_RULES):
+    """
+    Apply one profile's DOWNTURN/RECOVERY anchor and severity rules to every
+    row of an alert matrix, as masked popcounts over its bit-packed form.
+    Absent alerts count as not triggered.
+    """
+    registry = alert_bits.register(matrix.columns, {})
+    hit, _ = alert_bits.pack(matrix, registry)
+    state, severity, downturn_count, recovery_count = alert_bits.classify(hit, registry, rules)
+    return pd.DataFrame({
+        "state": state,
+        "severity": severity,
+        "downturn_alerts": downturn_count,
+        "recovery_alerts": recovery_count,
+    }, index=matrix.index)
+
+
+def latest_alerts(specs=ALERTS, raw_dir=RAW_DIR):
+    """
+    Live alert values (each symbol's latest row) for one chunk of the spec.
+    Runs in worker processes, so it loads its own prices.
+    """
+    prices = load_prices(specs, raw_dir)
+    return alert_matrix(prices, specs=specs).iloc[0]
+
+
+def chunk_specs(specs, chunks):
+    """
+    Split the spec into at most `chunks` groups, never splitting a symbol.
+    """
+    by_symbol = {}
+    for spec in specs:
+        by_symbol.setdefault(spec["symbol"], []).append(spec)
+
+    groups = [[] for _ in range(max(1, min(chunks, len(by_symbol))))]
+    for i, symbol_specs in enumerate(by_symbol.values()):
+        groups[i % len(groups)].extend(symbol_specs)
+    return groups
+
+
+def evaluate_latest(specs=ALERTS, raw_dir=RAW_DIR, workers=None):
+    """
+    Evaluate the live alert values for the whole spec, fanning out across a
+    process pool in per-symbol chunks once the universe is large enough.
+
+    Returns a Series of nullable booleans in spec order; alerts without
+    enough data are NA.
+    """
+    order = [spec["alert"] for spec in specs]
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(symbols(specs)) < PARALLEL_MIN_SYMBOLS:
+        return latest_alerts(specs, raw_dir).reindex(order)
+
+    chunks = chunk_specs(specs, workers * CHUNKS_PER_WORKER)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(latest_alerts, chunks, [raw_dir] * len(chunks)))
+
+    return pd.concat(parts).astype("boolean").reindex(order)
@@ -0,0 +1,178 @@
+"""
+Opt-in instrumentation.
+
+Set MARKET_TRACE=1 (or pass --trace to pipeline.py) to record timed spans
+per stage and per symbol, with row and byte counts and peak traced memory.
+The trace is written to data/output/trace/trace.json when the process
+exits. MARKET_PROFILE=span[,span ...] (or --profile SPAN) also dumps a
+cProfile stats file per named span to data/output/trace/<span>.pstats.
+
+With tracing off, span() and add() return after a single flag check.
+
+Usage:
+    python scripts/instrument.py [TRACE_JSON]     # print a span table
+    python -m pstats data/output/trace/evaluate.pstats
+"""
+
+import atexit
+import cProfile
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from pathlib import Path
+
+TRACE_DIR = Path("data/output/trace")
+TRACE_FILE = TRACE_DIR / "trace.json"
+
+ENV_TRACE = "MARKET_TRACE"
+ENV_PROFILE = "MARKET_PROFILE"
+
+_enabled = False
+_profile = set()
+_spans = []
+_lock = threading.Lock()
+_local = threading.local()
+_started = time.perf_counter()
+_peak = 0
+
+
+def enable(profile=()):
+    global _enabled
+    _profile.update(p for p in profile if p)
+    if _enabled:
+        return
+    _enabled = True
+    tracemalloc.start()
+    atexit.register(write)
+
+
+def enabled():
+    return _enabled
+
+
+def _stack():
+    if not hasattr(_local, "stack"):
+        _local.stack = []
+    return _local.stack
+
+
+def _main_thread():
+    return threading.current_thread() is threading.main_thread()
+
+
+@contextmanager
+def span(name, **attrs):
+    """
+    Time the enclosed block as a span named `name`. Extra keyword
+    arguments, and anything add()ed inside the block, are recorded on it.
+    """
+    if not _enabled:
+        yield
+        return
+
+    stack = _stack()
+    record = {
+        "name": name,
+        "parent": stack[-1]["name"] if stack else None,
+        "thread": threading.current_thread().name,
+        "start": round(time.perf_counter() - _started, 6),
+        **attrs,
+    }
+
+    # Peak memory is only tracked on the main thread, where spans nest.
+    track_memory = _main_thread()
+    if track_memory:
+        if stack:
+            stack[-1]["_peak"] = max(stack[-1].get("_peak", 0), tracemalloc.get_traced_memory()[1])
+        tracemalloc.reset_peak()
+
+    profiler = cProfile.Profile() if name in _profile else None
+    stack.append(record)
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+            TRACE_DIR.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(TRACE_DIR / f"{name.replace(':', '_')}.pstats")
+
+        record["seconds"] = round(time.perf_counter() - started, 6)
+        stack.pop()
+        if track_memory:
+            global _peak
+            peak = max(tracemalloc.get_traced_memory()[1], record.pop("_peak", 0))
+            record["peak_kb"] = peak // 1024
+            if stack:
+                stack[-1]["_peak"] = max(stack[-1].get("_peak", 0), peak)
+            _peak = max(_peak, peak)
+        with _lock:
+            _spans.append(record)
+
+
+def add(**counts):
+    """
+    Add numeric counts (rows, bytes_read, bytes_written, ...) to the
+    innermost open span of this thread.
+    """
+    if not _enabled:
+        return
+    stack = _stack()
+    if not stack:
+        return
+    record = stack[-1]
+    for key, value in counts.items():
+        record[key] = record.get(key, 0) + value
+
+
+def write(path=TRACE_FILE):
+    if not _spans:
+        return
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        spans = sorted(_spans, key=lambda s: s["start"])
+    trace = {
+        "command": " ".join(sys.argv),
+        "pid": os.getpid(),
+        "seconds": round(time.perf_counter() - _started, 6),
+        "peak_kb": max(_peak, tracemalloc.get_traced_memory()[1]) // 1024 if tracemalloc.is_tracing() else None,
+        "spans": spans,
+    }
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(trace, f, indent=2)
+    tmp.replace(path)
+
+
+def show(path=TRACE_FILE):
+    with open(path) as f:
+        trace = json.load(f)
+
+    print(f"{trace['command']}  —  {trace['seconds']:.3f}s, peak {trace['peak_kb']} KiB")
+    for s in trace["spans"]:
+        counts = "  ".join(
+            f"{k}={v}" for k, v in s.items()
+            if k not in ("name", "parent", "thread", "start", "seconds", "peak_kb")
+        )
+        peak = f"{s['peak_kb']:>8} KiB" if "peak_kb" in s else " " * 12
+        indent = "  " if s["parent"] else ""
+        print(f"⏱️  {indent + s['name']:<28} {s['seconds']:8.3f}s {peak}  {counts}")
+
+
+if os.environ.get(ENV_TRACE) or os.environ.get(ENV_PROFILE):
+    enable(os.environ.get(ENV_PROFILE, "").split(","))
+
+
+def main():
+    show(sys.argv[1] if len(sys.argv) > 1 else TRACE_FILE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+market-watch: one entry point for every stage.
+
+Each subcommand runs the matching script's main() with the remaining
+arguments, importing only that script. The state, narrate, cache, notify
+and trace commands load no numpy, pandas, requests or yfinance, so they
+start in a few tens of milliseconds. For state that holds whether the week
+is appended, replaced on a rerun or the history is bootstrapped:
+history_store reads its index and computes streaks with the standard
+library.
+
+Usage:
+    python scripts/market_watch.py <command> [args ...]
+    python scripts/market_watch.py <command> --help
+"""
+
+import importlib
+import sys
+
+# Subcommand -> (module, one-line help)
+COMMANDS = {
+    "pipeline": ("pipeline", "run the weekly pipeline in one process"),
+    "fetch": ("fetch_prices", "fetch prices into the store"),
+    "validate": ("validate_prices", "check stored prices and quarantine bad symbols"),
+    "evaluate": ("evaluate_alerts", "write the live alert snapshot"),
+    "state": ("state_logic", "classify the snapshot and record the week"),
+    "summarize": ("summarize_history", "monthly and quarterly summaries"),
+    "narrate": ("narrate_summaries", "narratives for the summaries"),
+    "dashboard": ("build_dashboard", "build the dashboard bundle"),
+    "alerts": ("alert_bits", "build/show the bit-packed alert history"),
+    "events": ("alert_events", "alert trigger/clear events and their status"),
+    "backfill": ("backfill_history", "rebuild the weekly history from prices"),
+    "backfill-parallel": ("parallel_backfill", "the same across a process pool, any span"),
+    "regimes": ("regimes", "daily, weekly and monthly regime series"),
+    "sweep": ("sweep_thresholds", "alert threshold sweep"),
+    "stream": ("streaming", "incremental indicator state"),
+    "store": ("price_store", "import/export the price store"),
+    "history": ("history_store", "rebuild/export the state history"),
+    "cache": ("build_cache", "show/clear the stage cache"),
+    "notify": ("notify", "show the notification ledger"),
+    "trace": ("instrument", "show a recorded trace"),
+    "benchmark": ("benchmark", "offline benchmark suite"),
+}
+
+
+def usage():
+    width = max(len(name) for name in COMMANDS)
+    lines = [__doc__.strip(), "", "Commands:"]
+    lines += [f"  {name:<{width}}  {help_}" for name, (_, help_) in COMMANDS.items()]
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+    if argv[0] not in COMMANDS:
+        print(f"❌ Unknown command: {argv[0]}\n\n{usage()}")
+        sys.exit(2)
+
+    module, _ = COMMANDS[argv[0]]
+    # The scripts read their own flags from sys.argv.
+    sys.argv = [f"market-watch {argv[0]}"] + argv[1:]
+    importlib.import_module(module).main()
+
+
+if __name__ == "__main__":
+    main()
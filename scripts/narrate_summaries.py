@@ -1,6 +1,9 @@
 import json
 from pathlib import Path
 
+import instrument
+from build_cache import write_if_changed
+
 OUTPUT_DIR = Path("data/output")
 
 MONTHLY_IN = OUTPUT_DIR / "monthly_summary.json"
@@ -69,25 +72,29 @@ def quarter_text(period, d):
         f"with {stability}. {streak_text} {sev_text}"
     )
 
-def main():
-    monthly = load_json(MONTHLY_IN)
-    quarterly = load_json(QUARTERLY_IN)
+def narrate(monthly, quarterly):
+    with instrument.span("narrate:text", periods=len(monthly) + len(quarterly)):
+        monthly_out = {
+            period: {"text": month_text(period, d)}
+            for period, d in monthly.items()
+        }
 
-    monthly_out = {
-        period: {"text": month_text(period, d)}
-        for period, d in monthly.items()
-    }
+        quarterly_out = {
+            period: {"text": quarter_text(period, d)}
+            for period, d in quarterly.items()
+        }
 
-    quarterly_out = {
-        period: {"text": quarter_text(period, d)}
-        for period, d in quarterly.items()
-    }
+    return monthly_out, quarterly_out
 
-    with open(MONTHLY_OUT, "w") as f:
-        json.dump(monthly_out, f, indent=2)
+def write_narratives(monthly_out, quarterly_out):
+    write_if_changed(MONTHLY_OUT, json.dumps(monthly_out, indent=2))
+    write_if_changed(QUARTERLY_OUT, json.dumps(quarterly_out, indent=2))
+
+def main():
+    monthly = load_json(MONTHLY_IN)
+    quarterly = load_json(QUARTERLY_IN)
 
-    with open(QUARTERLY_OUT, "w") as f:
-        json.dump(quarterly_out, f, indent=2)
+    write_narratives(*narrate(monthly, quarterly))
 
     print("✅ Deterministic monthly and quarterly narratives written")
 
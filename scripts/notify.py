@@ -0,0 +1,241 @@
+"""
+Notification dispatcher.
+
+State changes are queued as events and delivered to every configured sink
+from a bounded thread pool. Each attempt has a timeout; network errors,
+HTTP 429 and 5xx responses are retried with exponential backoff, any other
+HTTP error fails the delivery at once. Before a GitHub issue POST is
+retried, recent issues are searched for the event's marker, since a POST
+whose response was lost may already have opened the issue.
+
+Every event carries an idempotency key, a hash of (source, date, state,
+severity) rather than of the issue text. data/state/notifications.json
+records each (key, sink) delivered, so rerunning a week never opens a
+second issue, while a sink that failed is tried again on the next run.
+
+Sinks, enabled from the environment:
+  github    GITHUB_TOKEN and GITHUB_REPOSITORY; opens an issue through
+            GITHUB_API_URL (default https://api.github.com)
+  webhook   MARKET_WEBHOOK_URL; POSTs the event as JSON
+  file      MARKET_NOTIFY_FILE; appends the event as a JSON line
+
+Usage:
+    python scripts/notify.py show
+"""
+
+import json
+import os
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+
+import instrument
+from build_cache import digest, write_if_changed
+from http_client import check, session, with_retries
+
+LEDGER_FILE = Path("data/state/notifications.json")
+
+MAX_WORKERS = 4
+RETRIES = 3
+BACKOFF_SECONDS = 1.0
+REQUEST_TIMEOUT = 10  # seconds, per attempt
+
+# Recent issues searched for an event's marker before a POST is retried.
+RECENT_ISSUES = 50
+
+
+def post(url, payload, timeout, headers=None):
+    return check(session().post(url, json=payload, headers=headers, timeout=timeout))
+
+
+def event(snapshot, title, body, source="default"):
+    """
+    Notification for a snapshot. `source` tells apart universes or
+    portfolios that share a ledger.
+    """
+    return {
+        "key": digest(source, snapshot["date"], snapshot["state"], snapshot["severity"])[:16],
+        "source": source,
+        "date": snapshot["date"],
+        "state": snapshot["state"],
+        "severity": snapshot["severity"],
+        "title": title,
+        "body": body,
+    }
+
+
+class GitHubIssueSink:
+    name = "github"
+
+    def __init__(self, token, repo, api_url="https://api.github.com"):
+        self.url = f"{api_url.rstrip('/')}/repos/{repo}/issues"
+        self.headers = {
+            "Authorization": f"Bearer {token}",
+            "Accept": "application/vnd.github+json",
+        }
+
+    @staticmethod
+    def marker(event):
+        return f"<!-- market-watch:{event['key']} -->"
+
+    def send(self, event, timeout):
+        body = f"{event['body']}\n{self.marker(event)}\n"
+        response = post(self.url, {"title": event["title"], "body": body}, timeout, self.headers)
+        return response.json().get("html_url")
+
+    def find(self, event, timeout):
+        """
+        URL of a recent issue carrying the event's marker, or None. A POST
+        that timed out or failed with a 5xx may still have opened the issue.
+        """
+        params = {"state": "all", "sort": "created", "direction": "desc", "per_page": RECENT_ISSUES}
+        response = check(session().get(self.url, params=params, headers=self.headers, timeout=timeout))
+        for issue in response.json():
+            if self.marker(event) in (issue.get("body") or ""):
+                return issue.get("html_url")
+        return None
+
+
+class WebhookSink:
+    name = "webhook"
+
+    def __init__(self, url):
+        self.url = url
+
+    def send(self, event, timeout):
+        post(self.url, event, timeout, {"Idempotency-Key": event["key"]})
+        return None
+
+
+class FileSink:
+    name = "file"
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+
+    def send(self, event, timeout):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.lock, open(self.path, "a") as f:
+            f.write(json.dumps(event, sort_keys=True) + "\n")
+        return str(self.path)
+
+
+def configured_sinks(env=os.environ):
+    sinks = []
+    if env.get("GITHUB_TOKEN") and env.get("GITHUB_REPOSITORY"):
+        sinks.append(GitHubIssueSink(
+            env["GITHUB_TOKEN"],
+            env["GITHUB_REPOSITORY"],
+            env.get("GITHUB_API_URL", "https://api.github.com"),
+        ))
+    if env.get("MARKET_WEBHOOK_URL"):
+        sinks.append(WebhookSink(env["MARKET_WEBHOOK_URL"]))
+    if env.get("MARKET_NOTIFY_FILE"):
+        sinks.append(FileSink(env["MARKET_NOTIFY_FILE"]))
+    return sinks
+
+
+def deliver(sink, event, retries=RETRIES, timeout=REQUEST_TIMEOUT):
+    """
+    Send one event to one sink, retrying transient failures with
+    exponential backoff. Returns the sink's reference (e.g. issue URL).
+
+    Before a retry, a sink with a find() method is asked whether the failed
+    attempt got through after all, so a lost response cannot deliver twice.
+    """
+    attempt = 0
+
+    def call(timeout):
+        nonlocal attempt
+        attempt += 1
+        with instrument.span(f"notify:{sink.name}", attempt=attempt - 1):
+            if attempt > 1 and hasattr(sink, "find"):
+                ref = sink.find(event, timeout)
+                if ref is not None:
+                    return ref
+            return sink.send(event, timeout)
+
+    return with_retries(call, retries, BACKOFF_SECONDS, timeout)
+
+
+def load_ledger(path=LEDGER_FILE):
+    if not Path(path).exists():
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def save_ledger(ledger, path=LEDGER_FILE):
+    write_if_changed(path, json.dumps(ledger, indent=2, sort_keys=True))
+
+
+def dispatch(events, sinks=None, ledger_path=LEDGER_FILE, workers=MAX_WORKERS,
+             retries=RETRIES, timeout=REQUEST_TIMEOUT):
+    """
+    Deliver `events` to `sinks` (default: configured_sinks()), skipping
+    (key, sink) pairs already in the ledger. Returns a list of
+    (event, sink name, status, detail) with status "sent", "duplicate" or
+    "failed"; failures are reported, not raised.
+    """
+    sinks = configured_sinks() if sinks is None else sinks
+    if not events:
+        return []
+    if not sinks:
+        print("ℹ️  No notification sinks configured; skipping notifications")
+        return []
+
+    ledger = load_ledger(ledger_path)
+    pending, results = [], []
+    for e in events:
+        for sink in sinks:
+            if sink.name in ledger.get(e["key"], {}):
+                results.append((e, sink.name, "duplicate", ledger[e["key"]][sink.name].get("ref")))
+            else:
+                pending.append((e, sink))
+
+    with ThreadPoolExecutor(max_workers=min(workers, len(pending) or 1)) as pool:
+        futures = [(e, sink, pool.submit(deliver, sink, e, retries, timeout)) for e, sink in pending]
+        for e, sink, future in futures:
+            try:
+                ref = future.result()
+            except Exception as exc:
+                results.append((e, sink.name, "failed", str(exc)))
+                continue
+            ledger.setdefault(e["key"], {})[sink.name] = {
+                "ref": ref,
+                "title": e["title"],
+                "sent": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            }
+            results.append((e, sink.name, "sent", ref))
+
+    if pending:
+        save_ledger(ledger, ledger_path)
+    return results
+
+
+def report(results):
+    for e, sink, status, detail in results:
+        if status == "sent":
+            print(f"✅ Notification sent via {sink}: {e['title']}")
+        elif status == "duplicate":
+            print(f"ℹ️  Already notified via {sink}: {e['title']}")
+        else:
+            print(f"⚠️  Notification via {sink} failed: {detail}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["show"]:
+        print(__doc__)
+        sys.exit(2)
+
+    for key, sent in sorted(load_ledger().items(), key=lambda kv: min(s["sent"] for s in kv[1].values())):
+        for sink, entry in sent.items():
+            print(f"{key}  {sink:<8} {entry['sent']}  {entry['title']}  {entry['ref'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
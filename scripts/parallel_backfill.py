@@ -0,0 +1,197 @@
+"""
+Parallel backfill over shared memory.
+
+Same result as backfill_history.py, spread over a process pool. Each
+symbol's dates and closes are loaded once and copied into two
+multiprocessing.shared_memory blocks, one array per column with every
+symbol end to end. Workers attach to the blocks and slice them in place,
+so no price data is pickled.
+
+The work is cut into one shard per distinct (symbol, transform, window)
+column. A shard computes its column over the symbol's whole history, from
+the first bar, exactly as the serial pass does, so the values match it bit
+for bit, and evaluates every alert on that column at all the cutoffs. The
+matrix is assembled, classified per profile and written to the same
+history files as the serial backfill.
+
+Usage:
+    python scripts/parallel_backfill.py [--start YYYY-MM-DD] [--workers N]
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+import backfill_history
+import instrument
+import trading_calendar
+from indicators import (
+    ALERTS,
+    DEFAULT_RULES,
+    OPS,
+    column_key,
+    load_prices,
+    load_profiles,
+    transform,
+)
+from state_logic import DEFAULT_PROFILE
+
+# Shared blocks of the current process: {column: (SharedMemory, array)}
+_SHARED = {}
+
+
+# ---- SHARED PRICES ----
+
+def share(prices):
+    """
+    Copy every symbol's Date (as int64 ns) and Close into shared memory.
+    Returns the blocks, their names and the row offset of each symbol (plus
+    the total).
+    """
+    names = list(prices)
+    lengths = [len(prices[s]) for s in names]
+    offsets = np.r_[0, np.cumsum(lengths)].astype(np.int64)
+    total = int(offsets[-1])
+
+    blocks, block_names = [], {}
+    for column, dtype in (("Date", np.int64), ("Close", np.float64)):
+        block = shared_memory.SharedMemory(create=True, size=max(total, 1) * np.dtype(dtype).itemsize)
+        view = np.ndarray(total, dtype=dtype, buffer=block.buf)
+        for symbol, start in zip(names, offsets):
+            values = prices[symbol][column].to_numpy()
+            view[start:start + len(values)] = values.astype("datetime64[ns]").astype(np.int64) if column == "Date" else values
+        blocks.append(block)
+        block_names[column] = block.name
+    return blocks, block_names, dict(zip(names, zip(offsets[:-1], offsets[1:])))
+
+
+def attach(block_names, total):
+    """
+    Map the shared blocks into this process (pool initializer).
+    """
+    for column, dtype in (("Date", np.int64), ("Close", np.float64)):
+        block = shared_memory.SharedMemory(name=block_names[column])
+        _SHARED[column] = (block, np.ndarray(total, dtype=dtype, buffer=block.buf))
+
+
+def detach():
+    for block, _ in _SHARED.values():
+        block.close()
+    _SHARED.clear()
+
+
+# ---- SHARDS ----
+
+def evaluate_shard(task):
+    """
+    Values of the alerts on one column at the cutoffs (int64 ns):
+    {alert: (triggered, available)}. Runs in the workers.
+    """
+    (start, end), (_, name, window), specs, cutoffs = task
+    dates = _SHARED["Date"][1][start:end]
+    close = pd.Series(_SHARED["Close"][1][start:end], copy=False)
+
+    pos = np.searchsorted(dates, cutoffs, side="right") - 1
+    values = transform(close, name, window).to_numpy()[pos.clip(min=0)]
+    return {
+        spec["alert"]: (OPS[spec["op"]](values, spec["threshold"]), pos + 1 >= spec.get("min_rows", 1))
+        for spec in specs
+    }
+
+
+def shards(ranges, cutoffs, specs):
+    """
+    (symbol rows, column key, its specs, cutoffs) tasks, one per distinct
+    column of a symbol with data.
+    """
+    by_column = {}
+    for spec in specs:
+        if spec["symbol"] in ranges:
+            by_column.setdefault(column_key(spec), []).append(spec)
+    if not len(cutoffs):
+        return []
+    return [(ranges[key[0]], key, column_specs, cutoffs) for key, column_specs in by_column.items()]
+
+
+def alert_matrix(prices, cutoffs, specs=ALERTS, workers=None):
+    """
+    indicators.alert_matrix(prices, cutoffs, specs), computed in shards
+    across a process pool.
+    """
+    workers = workers or os.cpu_count() or 1
+    index = pd.DatetimeIndex(pd.to_datetime(cutoffs))
+    targets = index.to_numpy("datetime64[ns]").astype(np.int64)
+
+    blocks, block_names, ranges = share(prices)
+    total = sum(end - start for start, end in ranges.values())
+    try:
+        tasks = shards(ranges, targets, specs)
+        with instrument.span("parallel_backfill"):
+            if workers == 1:
+                attach(block_names, total)
+                try:
+                    parts = [evaluate_shard(t) for t in tasks]
+                finally:
+                    detach()
+            else:
+                with ProcessPoolExecutor(max_workers=workers, initializer=attach, initargs=(block_names, total)) as pool:
+                    parts = list(pool.map(evaluate_shard, tasks))
+            instrument.add(shards=len(tasks), rows=total)
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+    values = {alert: value for part in parts for alert, value in part.items()}
+    matrix = pd.DataFrame(index=index)
+    for spec in specs:
+        if spec["alert"] not in values:
+            continue
+        hit, available = values[spec["alert"]]
+        matrix[spec["alert"]] = pd.Series(hit, index=index).astype("boolean").where(available)
+    return matrix
+
+
+def evaluate_profiles(cutoffs, profiles, specs=ALERTS, workers=None):
+    """
+    backfill_history.evaluate_profiles() across a process pool.
+    """
+    prices = load_prices(specs, raw_dir=backfill_history.RAW_DIR)
+    matrix = alert_matrix(prices, cutoffs, specs, workers)
+    return backfill_history.classify_profiles(matrix, profiles)
+
+
+def evaluate_history(cutoffs, specs=ALERTS, workers=None):
+    return evaluate_profiles(cutoffs, {DEFAULT_PROFILE: DEFAULT_RULES}, specs, workers)[DEFAULT_PROFILE]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help=f"first week (default: the last {backfill_history.WEEKS_BACK} weeks)")
+    parser.add_argument("--workers", type=int, help="process pool size (default: all cores)")
+    args = parser.parse_args()
+
+    today = date.today()
+    if args.start:
+        weeks = trading_calendar.anchors(args.start, backfill_history.weekly_anchors(today, 1)[-1], "weekly")
+    else:
+        weeks = backfill_history.weekly_anchors(today)
+    weeks = pd.DatetimeIndex(weeks)
+
+    started = time.perf_counter()
+    histories = evaluate_profiles(weeks, load_profiles(), workers=args.workers)
+    elapsed = time.perf_counter() - started
+
+    backfill_history.write_histories(histories)
+    workers = args.workers or os.cpu_count() or 1
+    print(f"✅ {len(weeks)}-week backfill complete — {len(histories)} profiles, {workers} workers, {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+"""
+Weekly pipeline in a single process.
+
+Runs fetch -> validate -> evaluate -> state -> summarize -> narrate as a
+stage DAG, handing DataFrames and dicts from stage to stage in memory. A
+stage whose inputs did not change is skipped and its previous outputs are
+read back instead. All artifacts are written once, after every stage has
+run, followed by any notifications (see notify.py).
+
+Stage freshness comes from the content-hash manifest in build_cache.py:
+a stage is skipped when the hash of its inputs matches the last run and
+its outputs are unchanged on disk.
+
+--trace records a span trace of the run (see instrument.py) and --profile
+STAGE dumps a cProfile of the named stages next to it.
+
+Usage:
+    python scripts/pipeline.py [--skip-fetch] [--full] [--export-csv]
+                               [--force [STAGE ...]] [--trace] [--profile STAGE ...]
+"""
+
+import argparse
+import time
+from datetime import date
+from graphlib import TopologicalSorter
+
+import alert_bits
+import alert_events
+import build_cache
+import evaluate_alerts
+import fetch_prices
+import history_store
+import indicators
+import instrument
+import narrate_summaries
+import notify
+import price_store
+import state_logic
+import summarize_history
+import trading_calendar
+import validate_prices
+
+
+def stage_fetch(ctx):
+    if ctx["args"].skip_fetch:
+        return False
+
+    results = fetch_prices.fetch_all(ctx["args"].full)
+    fetch_prices.report(results)
+    if ctx["args"].export_csv:
+        ctx["writes"].append(fetch_prices.export_csv)
+    return True
+
+
+def price_files():
+    files = []
+    for symbol in indicators.symbols():
+        files += price_store.source_files(symbol)
+    return files
+
+
+def stage_validate(ctx):
+    key = build_cache.digest(*price_files(), str(date.today()))
+    outputs = [validate_prices.REPORT_FILE]
+
+    if ctx["cache"].fresh("validate", key):
+        report = validate_prices.load_report()
+        ctx["quarantined"], ctx["as_of"] = report["quarantined"], report["as_of"]
+        return False
+
+    report = validate_prices.validate()
+    validate_prices.show(report, warnings=False)
+    ctx["quarantined"], ctx["as_of"] = report["quarantined"], report["as_of"]
+    ctx["writes"].append(lambda: validate_prices.write_report(report))
+    ctx["cache"].ran("validate", key, outputs)
+    return True
+
+
+def stage_evaluate(ctx):
+    key = build_cache.digest(indicators.CONFIG_FILE, *price_files(), ctx["quarantined"])
+    outputs = [evaluate_alerts.OUT / "alerts_snapshot.csv", alert_bits.STORE_DIR / "meta.json", alert_events.STORE_DIR / "events.json"]
+
+    if ctx["cache"].fresh("evaluate", key):
+        ctx["alerts"] = state_logic.load_alerts()
+        return False
+
+    frame = evaluate_alerts.evaluate(ctx["quarantined"])
+    ctx["alerts"] = {a: bool(t) for a, t in zip(frame["alert"], frame["triggered"])}
+    ctx["writes"].append(lambda: evaluate_alerts.write_snapshot(frame))
+    # The live row joins the bit-packed history, dated at the latest bar,
+    # and its edges join the event log.
+    if ctx["as_of"]:
+        ctx["writes"].append(lambda: alert_bits.record(ctx["as_of"], ctx["alerts"]))
+        ctx["writes"].append(lambda: alert_events.update(ctx["as_of"]))
+    ctx["cache"].ran("evaluate", key, outputs)
+    return True
+
+
+def stage_state(ctx):
+    today = str(trading_calendar.last_session())
+    profiles = indicators.load_profiles()
+    inputs = {}
+    for profile in profiles:
+        last, run = state_logic.load_history(today, profile)
+        inputs[profile] = (state_logic.load_override(profile), last, run)
+
+    key = build_cache.digest(ctx["alerts"], profiles, inputs, today)
+    outputs = [state_logic.snapshot_file(p) for p in profiles]
+    histories = [state_logic.history_file(p) for p in profiles if not inputs[p][0]]
+
+    if ctx["cache"].fresh("state", key):
+        return False
+
+    # Every profile classifies the same alerts; only the rules differ.
+    for profile, rules in profiles.items():
+        override, last, run = inputs[profile]
+        snapshot, row, event = state_logic.evaluate_profile(
+            profile, rules, ctx["alerts"], override, last, run, today
+        )
+        ctx["writes"].append(lambda s=snapshot, p=profile: state_logic.write_snapshot(s, p))
+
+        if row is None:
+            print(f"⚠️  [{profile}] Manual override active — automated signals skipped")
+            continue
+
+        if profile == state_logic.DEFAULT_PROFILE:
+            ctx["row"] = row
+        ctx["writes"].append(lambda r=row, p=profile: state_logic.save_history(r, p))
+        if event:
+            ctx["notifications"].append(event)
+        print(f"✅ [{profile}] State — {snapshot['state']}, week {snapshot['weeks_in_state']}")
+
+    ctx["cache"].ran("state", key, outputs + histories)
+    return True
+
+
+def stage_summarize(ctx):
+    history = history_store.scan(path=state_logic.HISTORY_FILE)
+    generation = history_store.generation(ctx.get("row"), state_logic.HISTORY_FILE)
+    if "row" in ctx:
+        # The state stage's row is written with the other artifacts at the end.
+        history = history_store.with_row(history, ctx["row"])
+    key = build_cache.digest([[r["date"], r["state"], r["severity"]] for r in history])
+    outputs = [
+        summarize_history.OUTPUT_DIR / "monthly_summary.json",
+        summarize_history.OUTPUT_DIR / "quarterly_summary.json",
+        summarize_history.STATE_FILE,
+    ]
+
+    if ctx["cache"].fresh("summarize", key):
+        ctx["monthly"] = narrate_summaries.load_json(outputs[0])
+        ctx["quarterly"] = narrate_summaries.load_json(outputs[1])
+        return False
+
+    if not history:
+        ctx["monthly"], ctx["quarterly"] = {}, {}
+        return True
+
+    monthly, quarterly, state, _ = summarize_history.update(history, generation=generation)
+    ctx["monthly"], ctx["quarterly"] = monthly, quarterly
+    ctx["writes"].append(lambda: summarize_history.write_summaries(monthly, quarterly, state))
+    ctx["cache"].ran("summarize", key, outputs)
+    return True
+
+
+def stage_narrate(ctx):
+    key = build_cache.digest(ctx["monthly"], ctx["quarterly"])
+    outputs = [narrate_summaries.MONTHLY_OUT, narrate_summaries.QUARTERLY_OUT]
+
+    if ctx["cache"].fresh("narrate", key):
+        return False
+
+    narratives = narrate_summaries.narrate(ctx["monthly"], ctx["quarterly"])
+    ctx["writes"].append(lambda: narrate_summaries.write_narratives(*narratives))
+    ctx["cache"].ran("narrate", key, outputs)
+    return True
+
+
+# Stage name -> (upstream stages, function)
+STAGES = {
+    "fetch": ((), stage_fetch),
+    "validate": (("fetch",), stage_validate),
+    "evaluate": (("validate",), stage_evaluate),
+    "state": (("evaluate",), stage_state),
+    "summarize": (("state",), stage_summarize),
+    "narrate": (("summarize",), stage_narrate),
+}
+
+
+class StageCache:
+    """
+    Pipeline view of the build manifest: which stages are fresh, and which
+    ran and must be recorded once their outputs are written.
+    """
+
+    def __init__(self, force=None):
+        self.manifest = build_cache.load_manifest()
+        self.forced = set(STAGES) if force == [] else set(force or [])
+        self.pending = []
+
+    def fresh(self, stage, key):
+        if stage in self.forced:
+            return False
+        return build_cache.is_fresh(self.manifest, stage, key)
+
+    def ran(self, stage, key, outputs):
+        self.pending.append((stage, key, outputs))
+
+    def save(self):
+        for stage, key, outputs in self.pending:
+            build_cache.record(self.manifest, stage, key, outputs)
+        build_cache.save_manifest(self.manifest)
+
+
+def run(args, stages=STAGES):
+    """
+    Run every stage in dependency order against a shared context. A stage
+    returns whether it ran; a fresh stage reads its previous outputs back
+    instead. Returns the per-stage timings.
+    """
+    cache = StageCache(args.force)
+    ctx = {"args": args, "cache": cache, "writes": [], "notifications": []}
+    timings = []
+
+    order = TopologicalSorter({name: deps for name, (deps, _) in stages.items()})
+    for name in order.static_order():
+        _, func = stages[name]
+        started = time.perf_counter()
+        with instrument.span(name):
+            ran = func(ctx)
+            instrument.add(ran=int(ran))
+        timings.append((name, "ran" if ran else "skipped", time.perf_counter() - started))
+
+    started = time.perf_counter()
+    with instrument.span("write"):
+        for write in ctx["writes"]:
+            write()
+        cache.save()
+    notify.report(notify.dispatch(ctx["notifications"]))
+    timings.append(("write", f"{len(ctx['writes'])} artifacts", time.perf_counter() - started))
+
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--skip-fetch", action="store_true", help="use the stored prices as-is")
+    parser.add_argument("--full", action="store_true", help="fetch full price history")
+    parser.add_argument("--export-csv", action="store_true", help="export data/raw CSVs after fetching")
+    parser.add_argument("--force", nargs="*", metavar="STAGE", help="recompute these stages (all if none given)")
+    parser.add_argument("--trace", action="store_true", help=f"write a span trace to {instrument.TRACE_FILE}")
+    parser.add_argument("--profile", nargs="+", metavar="STAGE", default=[], help="dump a cProfile of these stages")
+    args = parser.parse_args()
+
+    if args.trace or args.profile:
+        instrument.enable(args.profile)
+
+    timings = run(args)
+
+    for name, status, seconds in timings:
+        print(f"⏱️  {name:<10} {seconds:7.3f}s  {status}")
+    print("✅ Pipeline complete")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+"""
+Columnar price store.
+
+Each symbol lives in data/store/<SYMBOL>/ as one raw little-endian array file
+per column (Date as int64 nanoseconds, prices as float64, Volume as int64 or
+float64) plus a small meta.json holding the row count and column dtypes.
+
+Appends write only the new sessions to the end of each column file and then
+bump the row count in meta.json, so a half-finished append is invisible to
+readers. Loads memory-map the column files and hand the arrays to pandas
+without copying them.
+
+The CSVs in data/raw are kept as an export format (and as a fallback for
+symbols that have no store yet).
+
+Usage:
+    python scripts/price_store.py import [SYMBOL ...]   # data/raw CSV -> store
+    python scripts/price_store.py export [SYMBOL ...]   # store -> data/raw CSV
+"""
+
+import sys
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import instrument
+import sidecar
+
+STORE_DIR = Path("data/store")
+RAW_DIR = Path("data/raw")
+
+COLUMNS = ["Date", "Open", "High", "Low", "Close", "Volume"]
+DATE_DTYPE = "<i8"
+
+
+def symbol_dir(symbol, store_dir=STORE_DIR):
+    return Path(store_dir) / symbol
+
+
+def read_meta(symbol, store_dir=STORE_DIR):
+    return sidecar.read_json(symbol_dir(symbol, store_dir) / "meta.json")
+
+
+def write_meta(symbol, meta, store_dir=STORE_DIR):
+    sidecar.write_json(symbol_dir(symbol, store_dir) / "meta.json", meta)
+
+
+def symbols(store_dir=STORE_DIR):
+    root = Path(store_dir)
+    if not root.exists():
+        return []
+    return sorted(p.parent.name for p in root.glob("*/meta.json"))
+
+
+def column_dtypes(df):
+    dtypes = {col: "<f8" for col in COLUMNS}
+    dtypes["Date"] = DATE_DTYPE
+
+    volume = df["Volume"].to_numpy(dtype="float64")
+    if np.isfinite(volume).all() and (volume == np.round(volume)).all():
+        dtypes["Volume"] = "<i8"
+    return dtypes
+
+
+def to_arrays(df, dtypes):
+    arrays = {"Date": pd.to_datetime(df["Date"]).to_numpy("datetime64[ns]").view(DATE_DTYPE)}
+    for col in COLUMNS[1:]:
+        arrays[col] = df[col].to_numpy(dtype=dtypes[col])
+    return arrays
+
+
+def normalize(df):
+    df = df.copy()
+    df["Date"] = pd.to_datetime(df["Date"]).dt.normalize()
+    for col in COLUMNS[1:]:
+        if col not in df.columns:
+            df[col] = 0 if col == "Volume" else np.nan
+    df = df.dropna(subset=["Date"]).sort_values("Date")
+    return df.drop_duplicates("Date", keep="last")[COLUMNS]
+
+
+def row_bytes(dtypes):
+    return sum(np.dtype(d).itemsize for d in dtypes.values())
+
+
+def write(symbol, df, store_dir=STORE_DIR):
+    """
+    Replace a symbol's stored history with `df`.
+    """
+    df = normalize(df)
+    path = symbol_dir(symbol, store_dir)
+    path.mkdir(parents=True, exist_ok=True)
+
+    dtypes = column_dtypes(df)
+    for col, arr in to_arrays(df, dtypes).items():
+        arr.astype(dtypes[col], copy=False).tofile(path / f"{col}.bin")
+    instrument.add(bytes_written=len(df) * row_bytes(dtypes))
+
+    write_meta(symbol, {"rows": len(df), "dtypes": dtypes}, store_dir)
+    return len(df)
+
+
+def append(symbol, df, store_dir=STORE_DIR):
+    """
+    Append the sessions in `df` that are newer than the last stored date.
+    Returns the number of rows appended.
+    """
+    meta = read_meta(symbol, store_dir)
+    if meta is None:
+        return write(symbol, df, store_dir)
+
+    df = normalize(df)
+    last = last_date(symbol, store_dir)
+    if last is not None:
+        df = df[df["Date"] > last]
+    if df.empty:
+        return 0
+
+    path = symbol_dir(symbol, store_dir)
+    dtypes = meta["dtypes"]
+    if dtypes["Volume"] == "<i8" and column_dtypes(df)["Volume"] != "<i8":
+        # Fractional volume showed up; widen the stored column once.
+        existing = load(symbol, store_dir=store_dir)
+        return write(symbol, pd.concat([existing, df]), store_dir)
+
+    for col, arr in to_arrays(df, dtypes).items():
+        size = meta["rows"] * np.dtype(dtypes[col]).itemsize
+        sidecar.append_at(path / f"{col}.bin", size, arr.astype(dtypes[col], copy=False).tobytes())
+    instrument.add(bytes_written=len(df) * row_bytes(dtypes))
+
+    meta["rows"] += len(df)
+    write_meta(symbol, meta, store_dir)
+    return len(df)
+
+
+def merge(symbol, df, store_dir=STORE_DIR):
+    """
+    Merge a recent slice of bars into the store.
+
+    Rows of `df` that overlap stored sessions are compared with what is
+    stored. From the first session that differs (a revised bar, or a
+    session present on only one side) the stored tail is replaced by `df`;
+    otherwise only the newer sessions are appended.
+
+    Returns (revised, appended): the number of stored sessions replaced and
+    the number of rows written.
+    """
+    meta = read_meta(symbol, store_dir)
+    if meta is None or meta["rows"] == 0:
+        return 0, write(symbol, df, store_dir)
+
+    df = normalize(df)
+    if df.empty:
+        return 0, 0
+
+    first = df["Date"].iloc[0]
+    stored = load(symbol, start=first, store_dir=store_dir)
+    overlap = df[df["Date"] <= last_date(symbol, store_dir)]
+
+    both = stored.merge(overlap, on="Date", how="outer", suffixes=("", "_new"), indicator=True)
+    prices = COLUMNS[1:]
+    old = both[prices].to_numpy(dtype="float64")
+    new = both[[f"{c}_new" for c in prices]].to_numpy(dtype="float64")
+    same = np.isclose(old, new, rtol=1e-9, atol=0, equal_nan=True).all(axis=1)
+    differs = (both["_merge"] != "both").to_numpy() | ~same
+
+    if not differs.any():
+        return 0, append(symbol, df, store_dir)
+
+    revised_from = both["Date"][differs].min()
+    keep = int(np.searchsorted(dates(symbol, store_dir), np.datetime64(revised_from), "left"))
+    revised = meta["rows"] - keep
+    truncate(symbol, keep, store_dir)
+    return revised, append(symbol, df[df["Date"] >= revised_from], store_dir)
+
+
+def back_adjusted(symbol, df, store_dir=STORE_DIR):
+    """
+    Whether a recent slice of bars looks rescaled against the store: its
+    first session that is also stored differs. Providers that serve
+    adjusted prices (Stooq) rescale every bar before an ex-dividend or split
+    date, so a change there, whether a constant ratio across the overlap or
+    a step inside it, means the older stored bars are on the old scale too.
+    """
+    if read_meta(symbol, store_dir) is None:
+        return False
+    df = normalize(df)
+    if df.empty:
+        return False
+
+    stored = load(symbol, start=df["Date"].iloc[0], store_dir=store_dir)
+    both = stored.merge(df, on="Date", how="inner", suffixes=("", "_new"))
+    if both.empty:
+        return False
+
+    # Volume is revised routinely and never rescaled with the prices.
+    prices = COLUMNS[1:5]
+    old = both[prices].iloc[0].to_numpy(dtype="float64")
+    new = both[[f"{c}_new" for c in prices]].iloc[0].to_numpy(dtype="float64")
+    return not np.isclose(old, new, rtol=1e-9, atol=0, equal_nan=True).all()
+
+
+def truncate(symbol, rows, store_dir=STORE_DIR):
+    """
+    Keep only the first `rows` sessions of a symbol.
+    """
+    meta = read_meta(symbol, store_dir)
+    if meta is None or rows >= meta["rows"]:
+        return
+    path = symbol_dir(symbol, store_dir)
+    for col, dtype in meta["dtypes"].items():
+        with open(path / f"{col}.bin", "r+b") as f:
+            f.truncate(rows * np.dtype(dtype).itemsize)
+    meta["rows"] = rows
+    write_meta(symbol, meta, store_dir)
+
+
+def column(symbol, col, store_dir=STORE_DIR):
+    meta = read_meta(symbol, store_dir)
+    if meta is None or meta["rows"] == 0:
+        return None
+    return np.memmap(
+        symbol_dir(symbol, store_dir) / f"{col}.bin",
+        dtype=meta["dtypes"][col],
+        mode="r",
+        shape=(meta["rows"],),
+    )
+
+
+def dates(symbol, store_dir=STORE_DIR):
+    arr = column(symbol, "Date", store_dir)
+    return None if arr is None else arr.view("datetime64[ns]")
+
+
+def source_files(symbol, store_dir=STORE_DIR, raw_dir=RAW_DIR):
+    """
+    Files a load() of `symbol` reads: the store's column files and meta, or
+    the fallback CSV.
+    """
+    meta = read_meta(symbol, store_dir)
+    if meta is None:
+        return [Path(raw_dir) / f"{symbol}.csv"]
+    path = symbol_dir(symbol, store_dir)
+    return [path / "meta.json"] + [path / f"{col}.bin" for col in meta["dtypes"]]
+
+
+def last_date(symbol, store_dir=STORE_DIR):
+    d = dates(symbol, store_dir)
+    if d is None:
+        return None
+    return pd.Timestamp(d[-1])
+
+
+def load_csv(symbol, start=None, end=None, raw_dir=RAW_DIR):
+    path = Path(raw_dir) / f"{symbol}.csv"
+    if not path.exists():
+        return None
+    df = pd.read_csv(path, parse_dates=["Date"], float_precision="round_trip")
+    instrument.add(rows=len(df), bytes_read=path.stat().st_size)
+    if start is not None:
+        df = df[df["Date"] >= pd.Timestamp(start)]
+    if end is not None:
+        df = df[df["Date"] <= pd.Timestamp(end)]
+    return df.reset_index(drop=True)
+
+
+def load(symbol, start=None, end=None, store_dir=STORE_DIR, raw_dir=RAW_DIR):
+    """
+    Load a symbol's daily bars, optionally limited to [start, end].
+
+    Columns are read-only memory maps over the store files. Symbols without
+    a store fall back to data/raw/<SYMBOL>.csv. Returns None if neither
+    exists.
+    """
+    if read_meta(symbol, store_dir) is None:
+        return load_csv(symbol, start, end, raw_dir)
+
+    d = dates(symbol, store_dir)
+    if d is None:
+        return pd.DataFrame({col: [] for col in COLUMNS})
+
+    lo = 0 if start is None else int(np.searchsorted(d, np.datetime64(pd.Timestamp(start)), "left"))
+    hi = len(d) if end is None else int(np.searchsorted(d, np.datetime64(pd.Timestamp(end)), "right"))
+
+    data = {"Date": d[lo:hi]}
+    for col in COLUMNS[1:]:
+        data[col] = column(symbol, col, store_dir)[lo:hi]
+    instrument.add(rows=hi - lo, bytes_read=(hi - lo) * row_bytes(read_meta(symbol, store_dir)["dtypes"]))
+    return pd.DataFrame(data, copy=False)
+
+
+def import_csv(symbol, store_dir=STORE_DIR, raw_dir=RAW_DIR):
+    df = load_csv(symbol, raw_dir=raw_dir)
+    if df is None:
+        print(f"⚠️  Missing data for {symbol}")
+        return 0
+    return write(symbol, df, store_dir)
+
+
+def export_csv(symbol, out_dir=RAW_DIR, store_dir=STORE_DIR):
+    if read_meta(symbol, store_dir) is None:
+        print(f"⚠️  No stored data for {symbol}")
+        return 0
+    df = load(symbol, store_dir=store_dir)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    df.to_csv(out_dir / f"{symbol}.csv", index=False, date_format="%Y-%m-%d")
+    return len(df)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if not argv or argv[0] not in ("import", "export"):
+        print(__doc__)
+        return
+
+    command, names = argv[0], argv[1:]
+    if command == "import":
+        names = names or sorted(p.stem for p in RAW_DIR.glob("*.csv"))
+        for symbol in names:
+            rows = import_csv(symbol)
+            print(f"✅ Imported {symbol} ({rows} rows)")
+    else:
+        for symbol in names or symbols():
+            rows = export_csv(symbol)
+            print(f"✅ Exported {symbol} ({rows} rows)")
+
+
+if __name__ == "__main__":
+    main()
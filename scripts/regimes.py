@@ -0,0 +1,96 @@
+"""
+Multi-horizon regime series.
+
+Evaluates the alert matrix once, at every stored trading session, and
+derives the weekly and monthly series from it by as-of resampling at each
+period's anchor session (see trading_calendar.py): the last session on or
+before the Friday or month end, which is exactly what evaluating the alerts
+at that date would give. Rows are dated with the anchor session. Every row is
+classified with the same DOWNTURN/RECOVERY/NOMINAL rules and severity
+formula as the weekly run, and each horizon goes to its own history file:
+
+    data/history/state_history_daily.csv
+    data/history/state_history_weekly.csv
+    data/history/state_history_monthly.csv
+
+Periods ending after the last stored session (the open week and month) are
+left out.
+
+Usage:
+    python scripts/regimes.py [--start YYYY-MM-DD] [--horizon {daily,weekly,monthly} ...]
+"""
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+import history_store
+import trading_calendar
+from indicators import RAW_DIR, alert_matrix, classify, load_prices
+
+HISTORY_DIR = Path("data/history")
+
+HORIZONS = ("daily", "weekly", "monthly")
+
+
+def history_file(horizon):
+    return HISTORY_DIR / f"state_history_{horizon}.csv"
+
+
+def sessions(prices, start=None):
+    """
+    Every date on which at least one symbol traded, from `start` (default:
+    the first date all symbols have data) to the last stored session.
+    """
+    dates = pd.DatetimeIndex(sorted(set().union(*(df["Date"] for df in prices.values()))))
+    if start is None:
+        start = max(df["Date"].iloc[0] for df in prices.values())
+    return dates[dates >= pd.Timestamp(start)]
+
+
+def daily_matrix(prices, start=None):
+    return alert_matrix(prices, sessions(prices, start))
+
+
+def resample(matrix, horizon):
+    """
+    Alert matrix as of each anchor session up to the last stored session:
+    the row of the last session on or before it.
+    """
+    if horizon == "daily":
+        return matrix
+    ends = trading_calendar.anchors(matrix.index[0], matrix.index[-1], horizon)
+    return matrix.reindex(pd.DatetimeIndex(ends), method="ffill")
+
+
+def regime_series(matrix):
+    states = classify(matrix)
+    return pd.DataFrame({
+        "date": matrix.index.strftime("%Y-%m-%d"),
+        "state": states["state"].to_numpy(),
+        "severity": states["severity"].to_numpy(),
+    })
+
+
+def run(start=None, horizons=HORIZONS, raw_dir=RAW_DIR):
+    """
+    Regime series for each horizon, all from one daily alert matrix.
+    """
+    matrix = daily_matrix(load_prices(raw_dir=raw_dir), start)
+    return {h: regime_series(resample(matrix, h)) for h in horizons}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help="first session (default: first date with data for every symbol)")
+    parser.add_argument("--horizon", nargs="+", choices=list(HORIZONS), default=list(HORIZONS))
+    args = parser.parse_args()
+
+    for horizon, series in run(args.start, args.horizon).items():
+        history_store.write(series.to_dict("records"), history_file(horizon))
+        print(f"✅ {horizon.capitalize()} regimes written — {len(series)} rows to {history_file(horizon)}")
+
+
+if __name__ == "__main__":
+    main()
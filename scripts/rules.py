@@ -0,0 +1,131 @@
+"""
+Universe, alert spec and state rules from config/universe.json, plus the
+named rule profiles in config/profiles.json.
+
+Kept free of numpy/pandas so the state stage can classify a snapshot
+without importing them; indicators.py builds the vectorized engine on top.
+"""
+
+import json
+from bisect import bisect_right
+from pathlib import Path
+
+CONFIG_FILE = Path("config/universe.json")
+PROFILES_FILE = Path("config/profiles.json")
+
+
+def load_config(path=CONFIG_FILE):
+    """
+    Symbol universe, alert spec and state rules from config/universe.json.
+
+    Each alert is one comparison of a per-symbol indicator column against a
+    threshold. Columns are keyed by (symbol, transform, window) and computed
+    once, however many alerts read them.
+
+    Transforms:
+      level          Close
+      ma             Close minus its `window`-day moving average
+      pct_from_high  % distance of Close from its `window`-day high
+      pct_from_low   % distance of Close from its `window`-day low
+
+    `min_rows` skips the alert entirely (rather than reporting False) until
+    the symbol has that many rows of history.
+    """
+    with open(path) as f:
+        return json.load(f)
+
+
+CONFIG = load_config()
+
+UNIVERSE = CONFIG["symbols"]
+ALERTS = CONFIG["alerts"]
+
+# ---- STATE RULES ----
+# Alert priority groups (ordered)
+DOWNTURN_ALERTS = CONFIG["downturn_alerts"]
+RECOVERY_ALERTS = CONFIG["recovery_alerts"]
+
+DOWNTURN_ANCHOR = CONFIG["downturn_anchor"]
+RECOVERY_ANCHOR = CONFIG["recovery_anchor"]
+RECOVERY_MIN_ALERTS = CONFIG["recovery_min_alerts"]
+
+# Severity is the number of steps the group's alert count has reached:
+# [3, 4, 5] gives min(max(count - 2, 0), 3).
+SEVERITY_STEPS = CONFIG.get("severity_steps", [3, 4, 5])
+
+# ---- RULE PROFILES ----
+DEFAULT_PROFILE = "default"
+
+DEFAULT_RULES = {
+    "downturn_alerts": DOWNTURN_ALERTS,
+    "recovery_alerts": RECOVERY_ALERTS,
+    "downturn_anchor": DOWNTURN_ANCHOR,
+    "recovery_anchor": RECOVERY_ANCHOR,
+    "recovery_min_alerts": RECOVERY_MIN_ALERTS,
+    "severity_steps": SEVERITY_STEPS,
+}
+
+
+def load_profiles(path=PROFILES_FILE, specs=ALERTS):
+    """
+    {name: rules} for the default profile (the rules in universe.json)
+    followed by every profile in config/profiles.json. A profile only lists
+    the rule fields it changes; every alert it names must be in the spec,
+    since all profiles read the same alert matrix.
+    """
+    profiles = {DEFAULT_PROFILE: DEFAULT_RULES}
+    if not Path(path).exists():
+        return profiles
+
+    with open(path) as f:
+        config = json.load(f)
+
+    known = {spec["alert"] for spec in specs}
+    for name, changes in config["profiles"].items():
+        unknown_fields = set(changes) - set(DEFAULT_RULES)
+        if unknown_fields:
+            raise ValueError(f"Profile {name}: unknown rule fields {sorted(unknown_fields)}")
+
+        rules = dict(DEFAULT_RULES, **changes)
+        named = rules["downturn_alerts"] + rules["recovery_alerts"] + [rules["downturn_anchor"], rules["recovery_anchor"]]
+        missing = [a for a in named if a not in known]
+        if missing:
+            raise ValueError(f"Profile {name}: unknown alerts {missing}")
+        profiles[name] = rules
+    return profiles
+
+
+def severity(count, steps=SEVERITY_STEPS):
+    return bisect_right(steps, count)
+
+
+def classify_alerts(alerts, rules=DEFAULT_RULES):
+    """
+    Classify a single {alert: triggered} mapping, e.g. alerts_snapshot.csv,
+    under one profile's rules. Same rules as indicators.classify(); absent
+    alerts count as not triggered.
+    """
+    triggered = {name for name, hit in alerts.items() if hit}
+    downturn_count = sum(a in triggered for a in rules["downturn_alerts"])
+    recovery_count = sum(a in triggered for a in rules["recovery_alerts"])
+
+    downturn = rules["downturn_anchor"] in triggered
+    recovery = (
+        not downturn
+        and rules["recovery_anchor"] in triggered
+        and recovery_count >= rules["recovery_min_alerts"]
+    )
+
+    if downturn:
+        state, level = "DOWNTURN", severity(downturn_count, rules["severity_steps"])
+    elif recovery:
+        state, level = "RECOVERY", severity(recovery_count, rules["severity_steps"])
+    else:
+        state, level = "NOMINAL", 0
+
+    return {
+        "state": state,
+        "severity": level,
+        "downturn_alerts": downturn_count,
+        "recovery_alerts": recovery_count,
+    }
@@ -0,0 +1,67 @@
+"""
+File helpers shared by the on-disk stores (price_store, history_store,
+alert_bits, alert_events).
+
+Each store keeps its data in append-only files next to a small JSON
+sidecar holding row counts and offsets. The sidecar is replaced atomically
+and written after the data, so it is the commit point: data files are cut
+back to the length it records before anything is appended to them.
+
+Standard library only, so the light stages can use it without numpy.
+"""
+
+import datetime
+import json
+from pathlib import Path
+
+EPOCH = datetime.date(1970, 1, 1)
+
+
+def read_json(path):
+    """
+    The JSON document at `path`, or None if there is none.
+    """
+    path = Path(path)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_json(path, data):
+    """
+    Replace `path` with `data` via a temporary file, so readers never see a
+    partial document.
+    """
+    path = Path(path)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=2)
+    tmp.replace(path)
+
+
+def append_at(path, size, data):
+    """
+    Write `data` at byte `size` of `path`, dropping anything after it (bytes
+    left behind by an interrupted append, or a tail being rewritten).
+    """
+    path = Path(path)
+    with open(path, "r+b" if path.exists() else "wb") as f:
+        f.truncate(size)
+        f.seek(0, 2)
+        f.write(data)
+
+
+def day(date):
+    """
+    Days since 1970-01-01 of a date, or of the YYYY-MM-DD prefix of its
+    string form.
+    """
+    return (datetime.date.fromisoformat(str(date)[:10]) - EPOCH).days
+
+
+def date_of(days):
+    """
+    The date `days` days after 1970-01-01.
+    """
+    return EPOCH + datetime.timedelta(days=int(days))
@@ -1,11 +1,14 @@
-from datetime import date
+import csv
 import json
 import random
-import csv
 from pathlib import Path
-import pandas as pd
-import os
-import requests
+
+import history_store
+import instrument
+import notify
+import trading_calendar
+from build_cache import write_if_changed
+from rules import DEFAULT_PROFILE, DEFAULT_RULES, classify_alerts, load_profiles
 
 # Paths
 OUTPUT = Path("data/output")
@@ -14,26 +17,13 @@ HISTORY_DIR = Path("data/history")
 OUTPUT.mkdir(parents=True, exist_ok=True)
 HISTORY_DIR.mkdir(parents=True, exist_ok=True)
 
-HISTORY_FILE = HISTORY_DIR / "state_history.csv"
-
-# Alert priority groups (ordered)
-DOWNTURN_ALERTS = [
-    "SPY below 200MA",
-    "VIX > 25",
-    "ARKK -15% from high",
-    "QQQ below 100MA",
-    "HYG -7%",
-    "IEF +5%",
-]
-
-RECOVERY_ALERTS = [
-    "SPY above 200MA",
-    "VIX < 20",
-    "QQQ +15% from low",
-    "ARKK +20% from low",
-    "HYG +7%",
-    "IEF -3%",
-]
+HISTORY_FILE = history_store.HISTORY_FILE
+OVERRIDE_FILE = Path("config/override.json")
+
+# Profiles other than the default keep their files under these directories.
+PROFILE_OUTPUT = OUTPUT / "profiles"
+PROFILE_HISTORY = HISTORY_DIR / "profiles"
+PROFILE_OVERRIDES = Path("config/overrides")
 
 # Banner language (editable)
 BANNER_TEXT = {
@@ -51,8 +41,23 @@ BANNER_TEXT = {
     ],
 }
 
-def load_override():
-    override_path = Path("config/override.json")
+def snapshot_file(profile=DEFAULT_PROFILE):
+    if profile == DEFAULT_PROFILE:
+        return OUTPUT / "state_snapshot.json"
+    return PROFILE_OUTPUT / profile / "state_snapshot.json"
+
+def history_file(profile=DEFAULT_PROFILE):
+    if profile == DEFAULT_PROFILE:
+        return HISTORY_FILE
+    return PROFILE_HISTORY / f"state_history_{profile}.csv"
+
+def override_file(profile=DEFAULT_PROFILE):
+    if profile == DEFAULT_PROFILE:
+        return OVERRIDE_FILE
+    return PROFILE_OVERRIDES / f"{profile}.json"
+
+def load_override(profile=DEFAULT_PROFILE):
+    override_path = override_file(profile)
     if not override_path.exists():
         return None
 
@@ -65,29 +70,29 @@ def load_override():
     return None
 
 def load_alerts():
-    df = pd.read_csv("data/output/alerts_snapshot.csv")
-    return {row["alert"]: bool(row["triggered"]) for _, row in df.iterrows()}
-
-def load_history():
-    if not HISTORY_FILE.exists():
-        return []
-    with open(HISTORY_FILE, newline="") as f:
-        return list(csv.DictReader(f))
-
-def weeks_in_state(history, state):
-    count = 0
-    for row in reversed(history):
-        if row["state"] == state:
-            count += 1
-        else:
-            break
-    return count
-
-def should_create_issue(history, current_state, current_severity):
-    if not history:
+    with instrument.span("load_alerts"):
+        with open("data/output/alerts_snapshot.csv", newline="") as f:
+            rows = list(csv.DictReader(f))
+        instrument.add(rows=len(rows))
+        return {row["alert"]: row["triggered"] == "True" for row in rows}
+
+def load_history(today=None, profile=DEFAULT_PROFILE):
+    """
+    (last row, run of its state) for the profile's history before `today`,
+    read from the history index rather than the whole CSV. A row already
+    recorded for `today` is ignored, so a rerun on the same day replaces it.
+    """
+    return history_store.before(str(today or trading_calendar.last_session()), history_file(profile))
+
+def weeks_in_state(run, state):
+    if run and run["state"] == state:
+        return run["weeks"]
+    return 0
+
+def should_create_issue(last, current_state, current_severity):
+    if not last:
         return False, None
 
-    last = history[-1]
     prev_state = last["state"]
     prev_severity = int(last["severity"])
 
@@ -99,73 +104,23 @@ def should_create_issue(history, current_state, current_severity):
 
     return False, None
 
-def create_github_issue(title, body):
-    token = os.environ.get("GITHUB_TOKEN")
-    repo = os.environ.get("GITHUB_REPOSITORY")
-
-    if not token or not repo:
-        print("ℹ️  GitHub token or repository not available; skipping issue creation")
-        return
-
-    url = f"https://api.github.com/repos/{repo}/issues"
-
-    headers = {
-        "Authorization": f"Bearer {token}",
-        "Accept": "application/vnd.github+json",
+def override_snapshot(override, today=None):
+    return {
+        "date": str(today or trading_calendar.last_session()),
+        "state": override["state"],
+        "severity": override["severity"],
+        "weeks_in_state": None,
+        "downturn_alerts": None,
+        "recovery_alerts": None,
+        "summary": override["message"],
+        "override": True,
     }
 
-    payload = {
-        "title": title,
-        "body": body,
-    }
-
-    response = requests.post(url, headers=headers, json=payload)
-
-    if response.status_code == 201:
-        print("✅ GitHub issue created")
-    else:
-        print(f"⚠️  Failed to create issue: {response.status_code}")
-        print(response.text)
-
-def main():
-    override = load_override()
+def build_snapshot(alerts, run, today=None, rules=DEFAULT_RULES):
+    result = classify_alerts(alerts, rules)
+    state = result["state"]
 
-    if override:
-        snapshot = {
-            "date": str(date.today()),
-            "state": override["state"],
-            "severity": override["severity"],
-            "weeks_in_state": None,
-            "downturn_alerts": None,
-            "recovery_alerts": None,
-            "summary": override["message"],
-            "override": True,
-        }
-
-        with open(OUTPUT / "state_snapshot.json", "w") as f:
-            json.dump(snapshot, f, indent=2)
-
-        print("⚠️  Manual override active — automated signals skipped")
-        return
-
-    alerts = load_alerts()
-    history = load_history()
-
-    downturn_count = sum(alerts.get(a, False) for a in DOWNTURN_ALERTS)
-    recovery_count = sum(alerts.get(a, False) for a in RECOVERY_ALERTS)
-
-    # Anchor logic
-    if alerts.get("SPY below 200MA"):
-        state = "DOWNTURN"
-        severity = min(3, max(0, downturn_count - 2))
-    elif alerts.get("SPY above 200MA") and recovery_count >= 3:
-        state = "RECOVERY"
-        severity = min(3, max(0, recovery_count - 2))
-    else:
-        state = "NOMINAL"
-        severity = 0
-
-    previous_weeks = weeks_in_state(history, state)
+    previous_weeks = weeks_in_state(run, state)
     weeks = previous_weeks + 1
 
     week_label = "week" if weeks == 1 else "weeks"
@@ -174,52 +129,49 @@ def main():
         weeks=f"{weeks} {week_label}"
     )
 
-    snapshot = {
-        "date": str(date.today()),
+    return {
+        "date": str(today or trading_calendar.last_session()),
         "state": state,
-        "severity": severity,
+        "severity": result["severity"],
         "weeks_in_state": weeks,
-        "downturn_alerts": downturn_count,
-        "recovery_alerts": recovery_count,
+        "downturn_alerts": result["downturn_alerts"],
+        "recovery_alerts": result["recovery_alerts"],
         "summary": summary,
         "override": False,
     }
 
-    # Write snapshot JSON
-    with open(OUTPUT / "state_snapshot.json", "w") as f:
-        json.dump(snapshot, f, indent=2)
-
-    # Append to history
-    write_header = not HISTORY_FILE.exists()
-    with open(HISTORY_FILE, "a", newline="") as f:
-        writer = csv.DictWriter(
-            f,
-            fieldnames=["date", "state", "severity"]
-        )
-        if write_header:
-            writer.writeheader()
-        writer.writerow({
-            "date": snapshot["date"],
-            "state": state,
-            "severity": severity,
-        })
-
-        # ---- GitHub Issue Logic ----
-    create_issue, reason = should_create_issue(history, state, severity)
-
-    if create_issue:
-        title = f"Market Risk State Update: {state} ({snapshot['date']})"
-
-        body = f"""## Market Risk State Update
+def history_row(snapshot):
+    return {
+        "date": snapshot["date"],
+        "state": snapshot["state"],
+        "severity": snapshot["severity"],
+    }
+
+def issue_for(last, snapshot, profile=DEFAULT_PROFILE):
+    """
+    (title, body) of the GitHub issue to open for this snapshot, or None.
+    """
+    state = snapshot["state"]
+    severity = snapshot["severity"]
+
+    create_issue, reason = should_create_issue(last, state, severity)
+    if not create_issue:
+        return None
+
+    title = f"Market Risk State Update: {state} ({snapshot['date']})"
+    if profile != DEFAULT_PROFILE:
+        title += f" [{profile}]"
+
+    body = f"""## Market Risk State Update
 
 **State:** {state}  
 **Severity:** {severity}  
-**Weeks in State:** {weeks}
+**Weeks in State:** {snapshot["weeks_in_state"]}
 
 **Reason:** {reason}
 
 **Summary:**  
-{summary}
+{snapshot["summary"]}
 
 ---
 
@@ -227,9 +179,51 @@ This issue was generated automatically by the Market Risk Monitor.
 It is informational only and does not constitute investment advice.
 """
 
-        create_github_issue(title, body)
+    return title, body
+
+def write_snapshot(snapshot, profile=DEFAULT_PROFILE):
+    write_if_changed(snapshot_file(profile), json.dumps(snapshot, indent=2))
 
-    print(f"✅ State snapshot written — {state}, week {weeks}")
+def save_history(row, profile=DEFAULT_PROFILE):
+    return history_store.upsert(row, history_file(profile))
+
+def evaluate_profile(profile, rules, alerts, override, last, run, today=None):
+    """
+    (snapshot, history row, notification) for one profile. An enabled
+    override replaces the snapshot and records no history; the row and
+    notification are None when there is nothing to record or send.
+    """
+    if override:
+        return override_snapshot(override, today), None, None
+
+    snapshot = build_snapshot(alerts, run, today, rules)
+    issue = issue_for(last, snapshot, profile)
+    event = notify.event(snapshot, *issue, source=profile) if issue else None
+    return snapshot, history_row(snapshot), event
+
+def main():
+    profiles = load_profiles()
+    overrides = {profile: load_override(profile) for profile in profiles}
+    # Every profile classifies the same alert snapshot.
+    alerts = None if all(overrides.values()) else load_alerts()
+    events = []
+
+    for profile, rules in profiles.items():
+        last, run = load_history(profile=profile)
+        snapshot, row, event = evaluate_profile(profile, rules, alerts, overrides[profile], last, run)
+        write_snapshot(snapshot, profile)
+
+        if row is None:
+            print(f"⚠️  [{profile}] Manual override active — automated signals skipped")
+            continue
+
+        save_history(row, profile)
+        if event:
+            events.append(event)
+        print(f"✅ [{profile}] State snapshot written — {snapshot['state']}, week {snapshot['weeks_in_state']}")
+
+    # ---- Notifications (GitHub issue, webhook, file) ----
+    notify.report(notify.dispatch(events))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,315 @@
+"""
+Streaming indicator state.
+
+Keeps the rolling indicators behind every alert as incremental state, so a
+new close costs O(1) instead of recomputing rolling windows over the full
+history:
+
+  ma             ring buffer with a compensated running sum
+  pct_from_high  monotonic deque of the window's candidate highs
+  pct_from_low   monotonic deque of the window's candidate lows
+
+The state is checkpointed to data/state/indicators.json between runs,
+with a digest of the last max(window) stored sessions it consumed. Each
+run checks that digest against the store, rebuilds a symbol whose window
+was revised, advances the rest by the sessions stored since the
+checkpoint, and writes alerts_snapshot.csv from it the way
+evaluate_alerts.py does (quarantined symbols hold their previous alerts).
+
+Usage:
+    python scripts/streaming.py             # advance checkpoint, write snapshot
+    python scripts/streaming.py --rebuild   # rebuild checkpoint from history
+"""
+
+import hashlib
+import json
+import math
+import sys
+from collections import deque
+from pathlib import Path
+
+import pandas as pd
+
+import evaluate_alerts
+import price_store
+import validate_prices
+from indicators import ALERTS, OPS, RAW_DIR, column_key
+
+STATE_FILE = Path("data/state/indicators.json")
+
+
+class RollingMean:
+    def __init__(self, window):
+        self.window = window
+        self.buffer = [0.0] * window
+        self.pos = 0
+        self.count = 0
+        self.total = 0.0
+        self.compensation = 0.0
+
+    def _add(self, x):
+        # Kahan summation keeps the running sum from drifting over decades.
+        y = x - self.compensation
+        t = self.total + y
+        self.compensation = (t - self.total) - y
+        self.total = t
+
+    def push(self, x):
+        if self.count >= self.window:
+            self._add(-self.buffer[self.pos])
+        self._add(x)
+        self.buffer[self.pos] = x
+        self.pos = (self.pos + 1) % self.window
+        self.count += 1
+
+    def value(self):
+        if self.count < self.window:
+            return math.nan
+        return self.total / self.window
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "buffer": self.buffer,
+            "pos": self.pos,
+            "count": self.count,
+            "total": self.total,
+            "compensation": self.compensation,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        obj = cls(d["window"])
+        obj.buffer = d["buffer"]
+        obj.pos = d["pos"]
+        obj.count = d["count"]
+        obj.total = d["total"]
+        obj.compensation = d["compensation"]
+        return obj
+
+
+class RollingExtreme:
+    """
+    Rolling max (or min) over the last `window` values via a monotonic deque
+    of (index, value) pairs.
+    """
+
+    def __init__(self, window, highest=True):
+        self.window = window
+        self.highest = highest
+        self.candidates = deque()
+        self.count = 0
+
+    def _dominated(self, old, new):
+        return old <= new if self.highest else old >= new
+
+    def push(self, x):
+        while self.candidates and self._dominated(self.candidates[-1][1], x):
+            self.candidates.pop()
+        self.candidates.append((self.count, x))
+        if self.candidates[0][0] <= self.count - self.window:
+            self.candidates.popleft()
+        self.count += 1
+
+    def value(self):
+        if self.count < self.window:
+            return math.nan
+        return self.candidates[0][1]
+
+    def to_dict(self):
+        return {
+            "window": self.window,
+            "highest": self.highest,
+            "candidates": [list(c) for c in self.candidates],
+            "count": self.count,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        obj = cls(d["window"], d["highest"])
+        obj.candidates = deque(tuple(c) for c in d["candidates"])
+        obj.count = d["count"]
+        return obj
+
+
+def new_indicator(name, window):
+    if name == "ma":
+        return RollingMean(window)
+    if name == "pct_from_high":
+        return RollingExtreme(window, highest=True)
+    if name == "pct_from_low":
+        return RollingExtreme(window, highest=False)
+    return None
+
+
+def indicator_value(name, indicator, close):
+    if name == "level":
+        return close
+    value = indicator.value()
+    if name == "ma":
+        return close - value
+    return (close / value - 1) * 100
+
+
+def column_id(name, window):
+    return name if window is None else f"{name}:{window}"
+
+
+def lookback(columns):
+    """
+    Sessions the indicators of one symbol look back over.
+    """
+    return max((window or 1 for _, window in columns), default=1)
+
+
+def window_digest(df):
+    """
+    Digest of the dates and closes of a run of sessions.
+    """
+    h = hashlib.sha256()
+    h.update(pd.DatetimeIndex(df["Date"]).to_numpy("datetime64[ns]").tobytes())
+    h.update(df["Close"].to_numpy(dtype="float64").tobytes())
+    return h.hexdigest()
+
+
+def new_symbol_state(columns):
+    return {
+        "rows": 0,
+        "last_date": None,
+        "close": math.nan,
+        "window": None,
+        "columns": {
+            column_id(name, window): new_indicator(name, window)
+            for name, window in columns
+        },
+    }
+
+
+def symbol_columns(specs):
+    columns = {}
+    for spec in specs:
+        symbol, name, window = column_key(spec)
+        columns.setdefault(symbol, {})[(name, window)] = None
+    return {symbol: list(cols) for symbol, cols in columns.items()}
+
+
+def advance(sym_state, date, close):
+    """
+    Feed one session's close into a symbol's state. Sessions at or before
+    the last one seen are ignored, so replays are harmless.
+    """
+    date = pd.Timestamp(date)
+    if sym_state["last_date"] is not None and date <= pd.Timestamp(sym_state["last_date"]):
+        return False
+    for indicator in sym_state["columns"].values():
+        if indicator is not None:
+            indicator.push(close)
+    sym_state["rows"] += 1
+    sym_state["close"] = close
+    sym_state["last_date"] = date.date().isoformat()
+    return True
+
+
+def catch_up(state, specs=ALERTS, raw_dir=RAW_DIR):
+    """
+    Advance every symbol by the sessions stored after its checkpoint. A
+    symbol whose required columns changed, or any of whose last max(window)
+    checkpointed sessions has since been revised in the store, is rebuilt
+    from its full history. Returns the number of sessions consumed.
+    """
+    consumed = 0
+    for symbol, columns in symbol_columns(specs).items():
+        wanted = {column_id(name, window) for name, window in columns}
+        sym_state = state.get(symbol)
+        if sym_state is None or set(sym_state["columns"]) != wanted:
+            sym_state = state[symbol] = new_symbol_state(columns)
+
+        start = sym_state["last_date"]
+        if start is not None:
+            seen = price_store.load(symbol, end=start, raw_dir=raw_dir)
+            seen = None if seen is None else seen.tail(lookback(columns))
+            if seen is None or seen.empty or window_digest(seen) != sym_state.get("window"):
+                sym_state = state[symbol] = new_symbol_state(columns)
+                start = None
+
+        df = price_store.load(symbol, start=start, raw_dir=raw_dir)
+        if df is None:
+            continue
+
+        for date, close in zip(df["Date"].to_numpy(), df["Close"].to_numpy()):
+            consumed += advance(sym_state, date, float(close))
+
+        if sym_state["last_date"] is not None:
+            tail = price_store.load(symbol, end=sym_state["last_date"], raw_dir=raw_dir)
+            sym_state["window"] = window_digest(tail.tail(lookback(columns)))
+    return consumed
+
+
+def latest(state, specs=ALERTS):
+    """
+    Alert values from the streaming state, in spec order, matching
+    indicators.evaluate_latest(). Alerts without data are NA.
+    """
+    values = {}
+    for spec in specs:
+        symbol, name, window = column_key(spec)
+        sym_state = state.get(symbol)
+        if sym_state is None or sym_state["rows"] < spec.get("min_rows", 1):
+            values[spec["alert"]] = pd.NA
+            continue
+        indicator = sym_state["columns"].get(column_id(name, window))
+        value = indicator_value(name, indicator, sym_state["close"])
+        values[spec["alert"]] = bool(OPS[spec["op"]](value, spec["threshold"]))
+    return pd.Series(values, dtype="boolean")
+
+
+def save(state, path=STATE_FILE):
+    payload = {}
+    for symbol, sym_state in state.items():
+        payload[symbol] = dict(sym_state, columns={
+            cid: None if ind is None else ind.to_dict()
+            for cid, ind in sym_state["columns"].items()
+        })
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    with open(tmp, "w") as f:
+        json.dump(payload, f)
+    tmp.replace(path)
+
+
+def load(path=STATE_FILE):
+    path = Path(path)
+    if not path.exists():
+        return {}
+    with open(path) as f:
+        payload = json.load(f)
+
+    state = {}
+    for symbol, sym_state in payload.items():
+        columns = {}
+        for cid, d in sym_state["columns"].items():
+            if d is None:
+                columns[cid] = None
+            elif "buffer" in d:
+                columns[cid] = RollingMean.from_dict(d)
+            else:
+                columns[cid] = RollingExtreme.from_dict(d)
+        state[symbol] = dict(sym_state, columns=columns)
+    return state
+
+
+def main():
+    state = {} if "--rebuild" in sys.argv[1:] else load()
+    consumed = catch_up(state)
+    save(state)
+
+    report = validate_prices.validate()
+    validate_prices.write_report(report)
+    latest_alerts = evaluate_alerts.hold_quarantined(latest(state), report["quarantined"])
+    evaluate_alerts.publish(evaluate_alerts.to_frame(latest_alerts), report["as_of"])
+    print(f"✅ Alert snapshot written from streaming state ({consumed} new sessions)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,37 @@
-import csv
+"""
+Monthly and quarterly summaries of the state history.
+
+Each period is summarized from a small mergeable aggregate (weeks, state
+counts, transitions, max severity, and the first, last and longest runs),
+read off the run-length timeline of its rows (timeline.py).
+data/state/summary_state.json keeps the aggregates of the open month and
+quarter, the last history row consumed, a chained digest of all of them
+and the history_store generation they were read at. While the generation
+is unchanged (the store has only appended since), a weekly run only checks
+that last row, folds the new rows into the open periods and extends the
+digest, leaving closed periods as they are in the previous summaries.
+After a rewrite the digest of the consumed rows is checked instead. Any
+mismatch with the sidecar (rewritten rows, edited summaries, an
+out-of-order date) falls back to a full recompute.
+
+Usage:
+    python scripts/summarize_history.py [--full]
+"""
+
+import hashlib
 import json
-from collections import Counter, defaultdict
+import sys
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 
-HISTORY_FILE = Path("data/history/state_history.csv")
+import history_store
+import instrument
+from build_cache import digest, write_if_changed
+
+HISTORY_FILE = history_store.HISTORY_FILE
 OUTPUT_DIR = Path("data/output")
+STATE_FILE = Path("data/state/summary_state.json")
 
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -16,123 +42,244 @@ def quarter_key(dt):
     q = (dt.month - 1) // 3 + 1
     return f"{dt.year}-Q{q}"
 
-def count_transitions(states):
-    transitions = 0
-    for prev, curr in zip(states, states[1:]):
-        if prev != curr:
-            transitions += 1
-    return transitions
-
-def longest_streak(states):
-    longest_state = None
-    longest_len = 0
-
-    current_state = None
-    current_len = 0
-
-    for s in states:
-        if s == current_state:
-            current_len += 1
-        else:
-            if current_len > longest_len:
-                longest_state = current_state
-                longest_len = current_len
-            current_state = s
-            current_len = 1
-
-    if current_len > longest_len:
-        longest_state = current_state
-        longest_len = current_len
+def month_key(dt):
+    return dt.strftime("%Y-%m")
+
+def merge(a, b):
+    """
+    Aggregate of two consecutive stretches of the same period. A run that
+    spans the join counts as one run, not as a transition.
+    """
+    if a is None:
+        return b
+
+    joined = a["last"][0] == b["first"][0]
+    counts = dict(a["counts"])
+    for state, n in b["counts"].items():
+        counts[state] = counts.get(state, 0) + n
+
+    first, last = list(a["first"]), list(b["last"])
+    if joined and a["transitions"] == 0:
+        first[1] += b["first"][1]
+    if joined and b["transitions"] == 0:
+        last[1] += a["last"][1]
+
+    # Earliest of the longest runs wins, as in a left-to-right scan.
+    candidates = [a["longest"]]
+    if joined:
+        candidates.append([a["last"][0], a["last"][1] + b["first"][1]])
+    candidates.append(b["longest"])
+    longest = candidates[0]
+    for run in candidates[1:]:
+        if run[1] > longest[1]:
+            longest = run
 
     return {
-        "state": longest_state,
-        "weeks": longest_len
+        "weeks": a["weeks"] + b["weeks"],
+        "counts": counts,
+        "transitions": a["transitions"] + b["transitions"] + (not joined),
+        "max_severity": max(a["max_severity"], b["max_severity"]),
+        "first": first,
+        "last": last,
+        "longest": list(longest),
     }
 
-def load_history():
-    if not HISTORY_FILE.exists():
-        print("⚠️  No history file found; skipping summaries")
-        return []
-
-    with open(HISTORY_FILE, newline="") as f:
-        rows = list(csv.DictReader(f))
-
-    for r in rows:
-        r["date"] = parse_date(r["date"])
-        r["severity"] = int(r["severity"])
-
-    return rows
-
-def summarize_monthly(history):
-    by_month = defaultdict(list)
-
-    for r in history:
-        key = r["date"].strftime("%Y-%m")
-        by_month[key].append(r)
+def monthly_entry(agg):
+    state_counts = Counter(agg["counts"])
+    return {
+        "weeks": agg["weeks"],
+        "dominant_state": state_counts.most_common(1)[0][0],
+        "weeks_by_state": dict(state_counts),
+        "transitions": agg["transitions"],
+        "max_severity": agg["max_severity"],
+    }
 
-    summary = {}
+def quarterly_entry(agg):
+    state_counts = Counter(agg["counts"])
+    total = agg["weeks"]
+    return {
+        "weeks": total,
+        "dominant_state": state_counts.most_common(1)[0][0],
+        "percent_by_state": {
+            k: round((v / total) * 100, 1)
+            for k, v in state_counts.items()
+        },
+        "transitions": agg["transitions"],
+        "longest_streak": {
+            "state": agg["longest"][0],
+            "weeks": agg["longest"][1]
+        },
+        "max_severity": agg["max_severity"],
+    }
 
-    for month, rows in by_month.items():
-        states = [r["state"] for r in rows]
-        severities = [r["severity"] for r in rows]
+# Period -> (key, summary entry, months per period)
+PERIODS = {
+    "monthly": (month_key, monthly_entry, 1),
+    "quarterly": (quarter_key, quarterly_entry, 3),
+}
 
-        state_counts = Counter(states)
+def read_rows():
+    if not HISTORY_FILE.exists():
+        print("⚠️  No history file found; skipping summaries")
+        return []
 
-        summary[month] = {
-            "weeks": len(rows),
-            "dominant_state": state_counts.most_common(1)[0][0],
-            "weeks_by_state": dict(state_counts),
-            "transitions": count_transitions(states),
-            "max_severity": max(severities),
-        }
+    return history_store.scan(path=HISTORY_FILE)
 
+def load_history():
+    return parse_rows(read_rows())
+
+def parse_rows(rows):
+    return [
+        dict(r, date=parse_date(r["date"]), severity=int(r["severity"]))
+        for r in rows
+    ]
+
+def fold(summary, open_period, history, period):
+    """
+    Fold parsed rows into a period summary. `open_period` is the
+    [key, aggregate] pair of the last period seen; it is updated in place
+    and only periods the rows touch are rewritten.
+    """
+    import numpy as np
+
+    from timeline import Timeline
+
+    key_fn, entry_fn, months = PERIODS[period]
+    tl = Timeline.from_rows(history)
+    if not len(tl):
+        return summary
+
+    period_ids = tl.days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64) // months
+    starts = np.flatnonzero(np.r_[True, period_ids[1:] != period_ids[:-1]])
+    ends = np.append(starts[1:], len(tl)) - 1
+
+    for lo, hi in zip(starts, ends):
+        key = key_fn(history[lo]["date"])
+        agg = tl.summary(tl.date(lo), tl.date(hi))
+        if open_period[0] == key:
+            agg = merge(open_period[1], agg)
+        open_period[:] = [key, agg]
+        summary[key] = entry_fn(agg)
     return summary
 
-def summarize_quarterly(history):
-    by_quarter = defaultdict(list)
-
-    for r in history:
-        key = quarter_key(r["date"])
-        by_quarter[key].append(r)
-
-    summary = {}
+def row_line(row):
+    return f"{str(row['date'])[:10]},{row['state']},{row['severity']}"
 
-    for quarter, rows in by_quarter.items():
-        states = [r["state"] for r in rows]
-        severities = [r["severity"] for r in rows]
-
-        state_counts = Counter(states)
-        total = len(states)
-
-        summary[quarter] = {
-            "weeks": total,
-            "dominant_state": state_counts.most_common(1)[0][0],
-            "percent_by_state": {
-                k: round((v / total) * 100, 1)
-                for k, v in state_counts.items()
-            },
-            "transitions": count_transitions(states),
-            "longest_streak": longest_streak(states),
-            "max_severity": max(severities),
-        }
-
-    return summary
+def row_digest(rows, prior=""):
+    """
+    Chained digest of the rows, continuing from the digest of the rows
+    before them, so a run only hashes the rows it adds.
+    """
+    h = prior
+    for r in rows:
+        h = hashlib.sha256(f"{h}\n{row_line(r)}".encode()).hexdigest()
+    return h
+
+def summarize(history):
+    monthly, quarterly, _ = summarize_rows(history)
+    return monthly, quarterly
+
+def summarize_rows(history, raw_rows=None, generation=None):
+    """
+    Full recompute. Returns (monthly, quarterly, sidecar state).
+    """
+    state = {"monthly": [None, None], "quarterly": [None, None]}
+    monthly = fold({}, state["monthly"], history, "monthly")
+    quarterly = fold({}, state["quarterly"], history, "quarterly")
+    return monthly, quarterly, sidecar(state, raw_rows or history, monthly, quarterly, generation)
+
+def sidecar(state, rows, monthly, quarterly, generation=None, history=None):
+    """
+    Sidecar state for `rows`; `history` is their chained digest when the
+    caller has already extended it.
+    """
+    last = rows[-1]["date"] if rows else None
+    return dict(
+        state,
+        rows=len(rows),
+        last_date=str(last)[:10] if last else None,
+        last_row=row_line(rows[-1]) if rows else None,
+        history=row_digest(rows) if history is None else history,
+        generation=generation,
+        summaries=digest(monthly, quarterly),
+    )
+
+def consumed(state, rows, generation=None):
+    """
+    Whether `rows` start with the rows summarized last time. Trusted when
+    the store has rewritten nothing since (same history_store generation);
+    otherwise their chained digest is checked.
+    """
+    n = state.get("rows", 0)
+    if len(rows) < n or "last_row" not in state:
+        return False
+    if (row_line(rows[n - 1]) if n else None) != state["last_row"]:
+        return False
+    if generation is not None and generation == state.get("generation"):
+        return True
+    return row_digest(rows[:n]) == state["history"]
+
+def load_json(path):
+    if not Path(path).exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def load_state():
+    return (
+        load_json(STATE_FILE),
+        load_json(OUTPUT_DIR / "monthly_summary.json"),
+        load_json(OUTPUT_DIR / "quarterly_summary.json"),
+    )
+
+def update(rows, prior=None, generation=None):
+    """
+    Summaries for the raw history rows (as read from the CSV), reusing the
+    previous summaries and sidecar state when the rows only extend what
+    was summarized last time. `generation` is the history_store generation
+    the rows were read at, if known. Returns (monthly, quarterly, sidecar
+    state, incremental).
+    """
+    state, monthly, quarterly = prior if prior is not None else load_state()
+    rows = list(rows)
+
+    new = None
+    if state and monthly is not None and quarterly is not None:
+        if digest(monthly, quarterly) == state["summaries"] and consumed(state, rows, generation):
+            new = parse_rows(rows[state["rows"]:])
+            dates = [parse_date(state["last_date"])] if state["last_date"] else []
+            dates += [r["date"] for r in new]
+            if any(b < a for a, b in zip(dates, dates[1:])):
+                new = None
+
+    if new is None:
+        with instrument.span("summarize:full", rows=len(rows)):
+            return (*summarize_rows(parse_rows(rows), rows, generation), False)
+
+    instrument.add(new_rows=len(new))
+    open_periods = {p: list(state[p]) for p in PERIODS}
+    fold(monthly, open_periods["monthly"], new, "monthly")
+    fold(quarterly, open_periods["quarterly"], new, "quarterly")
+    history = row_digest(rows[state["rows"]:], state["history"])
+    return monthly, quarterly, sidecar(open_periods, rows, monthly, quarterly, generation, history), True
+
+def write_summaries(monthly, quarterly, state=None):
+    write_if_changed(OUTPUT_DIR / "monthly_summary.json", json.dumps(monthly, indent=2))
+    write_if_changed(OUTPUT_DIR / "quarterly_summary.json", json.dumps(quarterly, indent=2))
+    if state is not None:
+        write_if_changed(STATE_FILE, json.dumps(state, indent=2))
 
 def main():
-    history = load_history()
-    if not history:
+    rows = read_rows()
+    if not rows:
         return
 
-    monthly = summarize_monthly(history)
-    quarterly = summarize_quarterly(history)
-
-    with open(OUTPUT_DIR / "monthly_summary.json", "w") as f:
-        json.dump(monthly, f, indent=2)
-
-    with open(OUTPUT_DIR / "quarterly_summary.json", "w") as f:
-        json.dump(quarterly, f, indent=2)
+    prior = (None, None, None) if "--full" in sys.argv[1:] else None
+    monthly, quarterly, state, incremental = update(rows, prior, history_store.generation(path=HISTORY_FILE))
+    write_summaries(monthly, quarterly, state)
 
-    print("✅ Monthly and quarterly summaries written")
+    mode = "updated" if incremental else "written"
+    print(f"✅ Monthly and quarterly summaries {mode}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
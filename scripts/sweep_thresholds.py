@@ -0,0 +1,249 @@
+"""
+Threshold/window sensitivity sweep.
+
+Evaluates every combination of the parameter grid in config/sweep.json
+against the full raw history, sampled at weekly Friday anchors, and scores
+the resulting regime timelines. Regimes are classified with a rule
+profile's rules (default: the production rules), through the same
+bit-packed classifier as the pipeline (alert_bits.regimes).
+
+Each (symbol, transform, window) series is computed once; every threshold
+for it is then applied in one broadcast comparison, giving a
+(variants x weeks) boolean matrix per alert. Combinations only index into
+those matrices, so the per-combination cost is a handful of vectorized
+sums, split across a process pool.
+
+Outputs (data/output/sweep/):
+    summary.csv      one row per combination: parameters, transitions,
+                     weeks and % of time in each state, max severity
+    timelines.npz    dates, parameter grid, and int8 state/severity
+                     matrices (combinations x weeks)
+
+Usage:
+    python scripts/sweep_thresholds.py [--start YYYY-MM-DD] [--workers N] [--profile NAME]
+"""
+
+import argparse
+import itertools
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import alert_bits
+import trading_calendar
+from indicators import (
+    ALERTS,
+    OPS,
+    asof_positions,
+    column_key,
+    compute_columns,
+    load_prices,
+    load_profiles,
+)
+from rules import DEFAULT_PROFILE
+
+SWEEP_CONFIG = Path("config/sweep.json")
+OUT_DIR = Path("data/output/sweep")
+
+STATES = ["NOMINAL", "DOWNTURN", "RECOVERY"]
+CHUNK_SIZE = 2048
+
+# Warm-up before the first anchor so the longest window has filled.
+WARMUP_SESSIONS = 260
+
+
+def load_sweep(path=SWEEP_CONFIG):
+    with open(path) as f:
+        return json.load(f)["parameters"]
+
+
+def alert_variants(parameters, specs=ALERTS):
+    """
+    For each alert, the list of spec variants it takes across the grid and
+    the parameters (in order) that select among them.
+    """
+    variants = {}
+    for spec in specs:
+        name = spec["alert"]
+        touching = [p for p, cfg in parameters.items() if name in cfg["alerts"]]
+        options = []
+        for p in touching:
+            cfg = parameters[p]
+            scale = cfg.get("scale", {}).get(name, 1)
+            options.append([(cfg["field"], v * scale) for v in cfg["values"]])
+
+        specs_for_alert = []
+        for combo in itertools.product(*options):
+            variant = dict(spec)
+            variant.update(combo)
+            specs_for_alert.append(variant)
+        variants[name] = (touching, specs_for_alert)
+    return variants
+
+
+def variant_matrices(prices, variants, dates):
+    """
+    Boolean (variants x dates) matrix per alert. Columns are computed once
+    per (symbol, transform, window), and variants that differ only in
+    threshold are compared in a single broadcast operation.
+    """
+    all_specs = [v for _, specs in variants.values() for v in specs]
+    columns = compute_columns(prices, all_specs)
+    positions = {s: asof_positions(df, dates) for s, df in prices.items()}
+
+    matrices = {}
+    for name, (_, specs) in variants.items():
+        rows = np.zeros((len(specs), len(dates)), dtype=bool)
+        groups = {}
+        for i, spec in enumerate(specs):
+            groups.setdefault((column_key(spec), spec["op"], spec.get("min_rows", 1)), []).append(i)
+
+        for (key, op, min_rows), idx in groups.items():
+            if key not in columns:
+                continue
+            pos = positions[key[0]]
+            values = columns[key].to_numpy()[pos.clip(min=0)]
+            values = np.where(pos >= 0, values, np.nan)
+            thresholds = np.array([specs[i]["threshold"] for i in idx], dtype="float64")
+            hit = OPS[op](values[None, :], thresholds[:, None])
+            rows[idx] = hit & (pos + 1 >= min_rows)[None, :]
+        matrices[name] = rows
+    return matrices
+
+
+def combination_index(parameters, variants):
+    """
+    Grid of combinations (rows) as value indices per parameter, plus each
+    alert's variant index for every combination.
+    """
+    names = list(parameters)
+    sizes = [len(parameters[p]["values"]) for p in names]
+    grid = np.array(list(itertools.product(*[range(n) for n in sizes])), dtype=np.int32)
+    grid = grid.reshape(-1, len(names))
+
+    alert_index = {}
+    for alert, (touching, _) in variants.items():
+        idx = np.zeros(len(grid), dtype=np.int32)
+        for p in touching:
+            j = names.index(p)
+            idx = idx * sizes[j] + grid[:, j]
+        alert_index[alert] = idx
+    return names, grid, alert_index
+
+
+_matrices = None
+_rules = None
+
+
+def _init_worker(matrices, rules):
+    global _matrices, _rules
+    _matrices, _rules = matrices, rules
+
+
+def score_chunk(alert_index):
+    """
+    State and severity timelines for a chunk of combinations. Runs in
+    worker processes.
+    """
+    m = _matrices
+    n = len(next(iter(alert_index.values())))
+    t = next(iter(m.values())).shape[1]
+
+    # Every (combination, week) is one row of alert bits.
+    registry = alert_bits.register(m, {})
+    hit = alert_bits.pack_arrays(
+        {alert: m[alert][alert_index[alert]].ravel() for alert in m},
+        registry,
+        n * t,
+    )
+    downturn, recovery, severity, _, _ = alert_bits.regimes(hit, registry, _rules)
+
+    state = np.zeros(n * t, dtype=np.int8)
+    state[recovery] = STATES.index("RECOVERY")
+    state[downturn] = STATES.index("DOWNTURN")
+    return state.reshape(n, t), severity.astype(np.int8).reshape(n, t)
+
+
+def summarize(names, parameters, grid, state, severity):
+    weeks = state.shape[1]
+    summary = pd.DataFrame({
+        p: np.asarray(parameters[p]["values"])[grid[:, j]]
+        for j, p in enumerate(names)
+    })
+    summary["transitions"] = (state[:, 1:] != state[:, :-1]).sum(axis=1)
+    for code, s in enumerate(STATES):
+        in_state = (state == code).sum(axis=1)
+        summary[f"weeks_{s.lower()}"] = in_state
+        summary[f"pct_{s.lower()}"] = np.round(in_state / weeks * 100, 1)
+    summary["max_severity"] = severity.max(axis=1)
+    summary["final_state"] = np.asarray(STATES)[state[:, -1]]
+    return summary
+
+
+def anchor_dates(prices, start=None):
+    if start is None:
+        start = max(
+            df["Date"].iloc[min(WARMUP_SESSIONS, len(df) - 1)]
+            for df in prices.values()
+        )
+    end = max(df["Date"].iloc[-1] for df in prices.values())
+    return pd.DatetimeIndex(trading_calendar.anchors(start, end, "weekly"))
+
+
+def run(start=None, workers=None, parameters=None, profile=DEFAULT_PROFILE):
+    parameters = parameters or load_sweep()
+    rules = load_profiles()[profile]
+    prices = load_prices()
+    dates = anchor_dates(prices, start)
+
+    variants = alert_variants(parameters)
+    matrices = variant_matrices(prices, variants, dates)
+    names, grid, alert_index = combination_index(parameters, variants)
+
+    chunks = [
+        {a: idx[i:i + CHUNK_SIZE] for a, idx in alert_index.items()}
+        for i in range(0, len(grid), CHUNK_SIZE)
+    ]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(matrices, rules)
+        results = [score_chunk(c) for c in chunks]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(matrices, rules)) as pool:
+            results = list(pool.map(score_chunk, chunks))
+
+    state = np.concatenate([r[0] for r in results])
+    severity = np.concatenate([r[1] for r in results])
+    return dates, names, grid, state, severity, summarize(names, parameters, grid, state, severity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--start", help="first anchor date (default: after warm-up for all symbols)")
+    parser.add_argument("--workers", type=int, help="worker processes (default: all cores)")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, help=f"rule profile (default: {DEFAULT_PROFILE})")
+    args = parser.parse_args()
+
+    dates, names, grid, state, severity, summary = run(args.start, args.workers, profile=args.profile)
+
+    OUT_DIR.mkdir(parents=True, exist_ok=True)
+    summary.to_csv(OUT_DIR / "summary.csv", index=False)
+    np.savez_compressed(
+        OUT_DIR / "timelines.npz",
+        dates=dates.strftime("%Y-%m-%d").to_numpy(dtype="U10"),
+        parameters=np.array(names),
+        grid=grid,
+        states=np.array(STATES),
+        profile=np.array(args.profile),
+        state=state,
+        severity=severity,
+    )
+    print(f"✅ Sweep complete [{args.profile}] — {len(grid)} combinations x {len(dates)} weeks")
+
+
+if __name__ == "__main__":
+    main()
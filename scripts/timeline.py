@@ -0,0 +1,211 @@
+"""
+Run-length-encoded regime timeline.
+
+A history of (date, state, severity) rows collapses into runs of identical
+(state, severity), and runs of the same state into streaks. The queries
+bisect run and row boundaries and read prefix sums or sparse tables, so
+each answers in logarithmic time however long the history is:
+
+  regime_at(date)            run in force on a date
+  current_streak(before)     state of the latest row and how many rows it has held
+  transitions(start, end)    state changes between consecutive rows
+  longest_streak(start, end) longest uninterrupted state (earliest wins ties)
+  summary(start, end)        the per-period aggregate summarize_history keeps
+
+Bounds are inclusive dates; either can be None. A streak clipped by a
+range bound only counts the rows inside it.
+"""
+
+import numpy as np
+
+from sidecar import day
+
+
+class SparseMax:
+    """
+    Static range-maximum over an int array; ties go to the earliest index.
+    """
+
+    def __init__(self, values):
+        n = len(values)
+        # One key orders by value, then by earliest index.
+        keys = np.asarray(values, dtype=np.int64) * (n + 1) + (n - np.arange(n))
+        self.n = n
+        self.levels = [keys]
+        width = 1
+        while 2 * width <= n:
+            prev = self.levels[-1]
+            self.levels.append(np.maximum(prev[:-width], prev[width:]))
+            width *= 2
+
+    def argmax(self, lo, hi):
+        """
+        Index of the maximum in values[lo:hi] (hi > lo).
+        """
+        level = (hi - lo).bit_length() - 1
+        keys = self.levels[level]
+        key = max(keys[lo], keys[hi - (1 << level)])
+        return self.n - int(key % (self.n + 1))
+
+
+class Timeline:
+    def __init__(self, dates, states, severities):
+        n = len(dates)
+        self.days = np.array([day(d) for d in dates], dtype=np.int64)
+        if n and (np.diff(self.days) < 0).any():
+            raise ValueError("Timeline rows must be in date order")
+
+        self.state_names = list(dict.fromkeys(states))
+        codes = np.array([self.state_names.index(s) for s in states], dtype=np.int64)
+        severity = np.array([int(s) for s in severities], dtype=np.int64)
+
+        # Runs of identical (state, severity), and streaks of identical state.
+        streak_break = np.r_[True, codes[1:] != codes[:-1]][:n]
+        run_break = streak_break | np.r_[True, severity[1:] != severity[:-1]][:n]
+
+        self.run_start = np.append(np.flatnonzero(run_break), n)
+        self.run_state = codes[self.run_start[:-1]]
+        self.run_severity = severity[self.run_start[:-1]]
+
+        self.streak_start = np.append(np.flatnonzero(streak_break), n)
+        self.streak_state = codes[self.streak_start[:-1]]
+        self.streak_rows = np.diff(self.streak_start)
+
+        self.state_rows = np.zeros((len(self.state_names), n + 1), dtype=np.int64)
+        for code in range(len(self.state_names)):
+            self.state_rows[code, 1:] = np.cumsum(codes == code)
+        self.state_streaks = [np.flatnonzero(self.streak_state == code) for code in range(len(self.state_names))]
+
+        self.longest = SparseMax(self.streak_rows) if len(self.streak_rows) else None
+        self.max_severity = SparseMax(self.run_severity) if len(self.run_severity) else None
+
+    @classmethod
+    def from_rows(cls, rows):
+        rows = list(rows)
+        return cls(
+            [r["date"] for r in rows],
+            [r["state"] for r in rows],
+            [r["severity"] for r in rows],
+        )
+
+    def __len__(self):
+        return len(self.days)
+
+    def bounds(self, start=None, end=None):
+        """
+        Row positions [lo, hi) of the rows dated within [start, end].
+        """
+        lo = 0 if start is None else int(np.searchsorted(self.days, day(start), "left"))
+        hi = len(self.days) if end is None else int(np.searchsorted(self.days, day(end), "right"))
+        return lo, max(lo, hi)
+
+    def run_of(self, row):
+        return int(np.searchsorted(self.run_start, row, "right")) - 1
+
+    def streak_of(self, row):
+        return int(np.searchsorted(self.streak_start, row, "right")) - 1
+
+    def date(self, row):
+        return str(self.days[row].astype("datetime64[D]"))
+
+    def runs(self):
+        """
+        The encoded timeline: (state, severity, first date, last date) per run.
+        """
+        return [
+            (
+                self.state_names[self.run_state[i]],
+                int(self.run_severity[i]),
+                self.date(self.run_start[i]),
+                self.date(self.run_start[i + 1] - 1),
+            )
+            for i in range(len(self.run_state))
+        ]
+
+    def regime_at(self, date):
+        """
+        {state, severity, start, end} of the run holding the last row on or
+        before `date`, or None before the first row.
+        """
+        _, hi = self.bounds(None, date)
+        if hi == 0:
+            return None
+        i = self.run_of(hi - 1)
+        return {
+            "state": self.state_names[self.run_state[i]],
+            "severity": int(self.run_severity[i]),
+            "start": self.date(self.run_start[i]),
+            "end": self.date(self.run_start[i + 1] - 1),
+        }
+
+    def current_streak(self, before=None):
+        """
+        {state, weeks} of the latest row dated before `before` (all rows if
+        None) and how many rows in a row it has held, or None.
+        """
+        hi = len(self.days) if before is None else int(np.searchsorted(self.days, day(before), "left"))
+        if hi == 0:
+            return None
+        i = self.streak_of(hi - 1)
+        return {"state": self.state_names[self.streak_state[i]], "weeks": hi - int(self.streak_start[i])}
+
+    def transitions(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        if hi - lo < 2:
+            return 0
+        return self.streak_of(hi - 1) - self.streak_of(lo)
+
+    def _clipped(self, i, lo, hi):
+        rows = min(int(self.streak_start[i + 1]), hi) - max(int(self.streak_start[i]), lo)
+        return [self.state_names[self.streak_state[i]], rows]
+
+    def _longest(self, lo, hi):
+        first, last = self.streak_of(lo), self.streak_of(hi - 1)
+        candidates = [self._clipped(first, lo, hi)]
+        if last - first > 1:
+            i = self.longest.argmax(first + 1, last)
+            candidates.append([self.state_names[self.streak_state[i]], int(self.streak_rows[i])])
+        if last > first:
+            candidates.append(self._clipped(last, lo, hi))
+
+        best = candidates[0]
+        for c in candidates[1:]:
+            if c[1] > best[1]:
+                best = c
+        return best
+
+    def longest_streak(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        if hi == lo:
+            return {"state": None, "weeks": 0}
+        state, weeks = self._longest(lo, hi)
+        return {"state": state, "weeks": weeks}
+
+    def summary(self, start=None, end=None):
+        """
+        summarize_history aggregate of the rows within [start, end]: weeks,
+        state counts in order of first appearance, transitions, max
+        severity and the first, last and longest streaks. None if empty.
+        """
+        lo, hi = self.bounds(start, end)
+        if hi == lo:
+            return None
+
+        first, last = self.streak_of(lo), self.streak_of(hi - 1)
+        appearances = []
+        for code, streaks in enumerate(self.state_streaks):
+            count = int(self.state_rows[code, hi] - self.state_rows[code, lo])
+            if count:
+                k = int(np.searchsorted(streaks, first, "left"))
+                appearances.append((int(streaks[k]), self.state_names[code], count))
+        appearances.sort()
+
+        return {
+            "weeks": hi - lo,
+            "counts": {state: count for _, state, count in appearances},
+            "transitions": last - first,
+            "max_severity": int(self.run_severity[self.max_severity.argmax(self.run_of(lo), self.run_of(hi - 1) + 1)]),
+            "first": self._clipped(first, lo, hi),
+            "last": self._clipped(last, lo, hi),
+            "longest": self._longest(lo, hi),
+        }
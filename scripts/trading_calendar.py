@@ -0,0 +1,259 @@
+"""
+NYSE trading calendar.
+
+Sessions are weekdays that are not in config/nyse_holidays.csv, a table of
+full-day closures (the regular holidays with their weekend observance,
+plus unscheduled closures such as 2001-09-11 and 2012-10-29/30) generated
+from the rules below and checked in, so nothing is fetched at run time.
+
+Anchors are the session that closes a period: the last session on or
+before the period's nominal end (Friday, month end, quarter end). A week
+whose Friday is a holiday is anchored on Thursday.
+
+The array functions (sessions, roll_back, period_end, anchor, anchors,
+asof_index) work on whole datetime64 arrays at once. last_session() is a
+scalar helper that needs no numpy, for the state stage.
+
+Usage:
+    python scripts/trading_calendar.py build   # regenerate the holiday table
+"""
+
+import csv
+import sys
+from datetime import date, timedelta
+from functools import lru_cache
+from pathlib import Path
+
+# Resolved from this file, so lookups work from any working directory (the
+# benchmark runs in a scratch directory).
+HOLIDAYS_FILE = Path(__file__).resolve().parent.parent / "config" / "nyse_holidays.csv"
+FIRST_YEAR = 1990
+LAST_YEAR = 2035
+
+FREQUENCIES = ("daily", "weekly", "monthly", "quarterly")
+
+# Unscheduled full-day closures
+SPECIAL_CLOSURES = {
+    "1994-04-27": "National Day of Mourning (Nixon)",
+    "2001-09-11": "September 11",
+    "2001-09-12": "September 11",
+    "2001-09-13": "September 11",
+    "2001-09-14": "September 11",
+    "2004-06-11": "National Day of Mourning (Reagan)",
+    "2007-01-02": "National Day of Mourning (Ford)",
+    "2012-10-29": "Hurricane Sandy",
+    "2012-10-30": "Hurricane Sandy",
+    "2018-12-05": "National Day of Mourning (G.H.W. Bush)",
+    "2025-01-09": "National Day of Mourning (Carter)",
+}
+
+
+# ---- HOLIDAY RULES ----
+
+def easter(year):
+    """
+    Gregorian Easter Sunday (anonymous algorithm).
+    """
+    a, b, c = year % 19, year // 100, year % 100
+    d, e = b // 4, b % 4
+    g = (8 * b + 13) // 25
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = c // 4, c % 4
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 19 * l) // 433
+    month = (h + l - 7 * m + 90) // 25
+    return date(year, month, (h + l - 7 * m + 33 * month + 19) % 32)
+
+
+def nth_weekday(year, month, weekday, n):
+    """
+    The n-th `weekday` (Monday = 0) of a month; n = -1 for the last.
+    """
+    if n > 0:
+        first = date(year, month, 1)
+        return first + timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1)
+    return last - timedelta(days=(last.weekday() - weekday) % 7)
+
+
+def observed(d):
+    """
+    Saturday holidays close the Friday before, Sunday ones the Monday after.
+    """
+    if d.weekday() == 5:
+        return d - timedelta(days=1)
+    if d.weekday() == 6:
+        return d + timedelta(days=1)
+    return d
+
+
+def holidays_for(year):
+    """
+    (date, name) of every regular NYSE holiday in a year.
+    """
+    days = []
+    new_year = date(year, 1, 1)
+    # A Saturday New Year's Day is not made up on the Friday before.
+    if new_year.weekday() != 5:
+        days.append((observed(new_year), "New Year's Day"))
+    if year >= 1998:
+        days.append((nth_weekday(year, 1, 0, 3), "Martin Luther King Jr. Day"))
+    days.append((nth_weekday(year, 2, 0, 3), "Washington's Birthday"))
+    days.append((easter(year) - timedelta(days=2), "Good Friday"))
+    days.append((nth_weekday(year, 5, 0, -1), "Memorial Day"))
+    if year >= 2022:
+        days.append((observed(date(year, 6, 19)), "Juneteenth"))
+    days.append((observed(date(year, 7, 4)), "Independence Day"))
+    days.append((nth_weekday(year, 9, 0, 1), "Labor Day"))
+    days.append((nth_weekday(year, 11, 3, 4), "Thanksgiving Day"))
+    days.append((observed(date(year, 12, 25)), "Christmas Day"))
+    return days
+
+
+def build(first=FIRST_YEAR, last=LAST_YEAR):
+    rows = {d.isoformat(): name for year in range(first, last + 1) for d, name in holidays_for(year)}
+    rows.update({d: name for d, name in SPECIAL_CLOSURES.items() if first <= int(d[:4]) <= last})
+    return sorted(rows.items())
+
+
+def write_table(rows, path=HOLIDAYS_FILE):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f, lineterminator="\n")
+        writer.writerow(["date", "name"])
+        writer.writerows(rows)
+
+
+# ---- LOOKUPS ----
+
+@lru_cache(maxsize=None)
+def holidays(path=HOLIDAYS_FILE):
+    """
+    Closure dates (ISO strings) from the holiday table.
+    """
+    with open(path, newline="") as f:
+        return frozenset(row["date"] for row in csv.DictReader(f))
+
+
+def is_session(d):
+    return d.weekday() < 5 and d.isoformat() not in holidays()
+
+
+def last_session(d=None):
+    """
+    The last session on or before `d` (default: today).
+    """
+    d = d or date.today()
+    while not is_session(d):
+        d -= timedelta(days=1)
+    return d
+
+
+@lru_cache(maxsize=None)
+def busdaycalendar():
+    import numpy as np
+
+    return np.busdaycalendar(weekmask="1111100", holidays=sorted(holidays()))
+
+
+def days(dates):
+    import numpy as np
+
+    return np.asarray(dates, dtype="datetime64[D]")
+
+
+def sessions(start, end):
+    """
+    Every session in [start, end].
+    """
+    import numpy as np
+
+    start, end = days(start), days(end)
+    span = np.arange(start, end + 1, dtype="datetime64[D]")
+    return span[np.is_busday(span, busdaycal=busdaycalendar())]
+
+
+def roll_back(dates):
+    """
+    The session on or before each date.
+    """
+    import numpy as np
+
+    return np.busday_offset(days(dates), 0, roll="backward", busdaycal=busdaycalendar())
+
+
+def period_end(dates, freq):
+    """
+    Nominal end of the period holding each date: the date itself, the
+    Friday closing its Saturday-to-Friday week, or the last calendar day of
+    its month or quarter.
+    """
+    import numpy as np
+
+    d = days(dates)
+    if freq == "daily":
+        return d
+    if freq == "weekly":
+        # 1970-01-01 was a Thursday; this is the weekday with Monday = 0.
+        weekday = (d.astype(np.int64) + 3) % 7
+        return d + (4 - weekday) % 7
+    months = d.astype("datetime64[M]")
+    if freq == "quarterly":
+        months = months + (2 - months.astype(np.int64) % 3)
+    elif freq != "monthly":
+        raise ValueError(f"Unknown frequency {freq!r}; expected one of {FREQUENCIES}")
+    return (months + 1).astype("datetime64[D]") - 1
+
+
+def anchor(dates, freq):
+    """
+    Anchor session of the period holding each date.
+    """
+    return roll_back(period_end(dates, freq))
+
+
+def anchors(start, end, freq):
+    """
+    Anchor sessions of every period from the one holding `start` to the one
+    holding `end`, keeping those that fall within [start, end].
+    """
+    import numpy as np
+
+    start, end = days(start), days(end)
+    if freq == "daily":
+        return sessions(start, end)
+    if freq == "weekly":
+        ends = np.arange(period_end(start, freq), period_end(end, freq) + 1, 7)
+    else:
+        step = 3 if freq == "quarterly" else 1
+        first = period_end(start, freq).astype("datetime64[M]")
+        months = np.arange(first, end.astype("datetime64[M]") + step, step)
+        ends = period_end(months.astype("datetime64[D]"), freq)
+    rolled = roll_back(ends)
+    return rolled[(rolled >= start) & (rolled <= end)]
+
+
+def asof_index(series_dates, targets):
+    """
+    Position in sorted `series_dates` of the last entry on or before each
+    target (-1 if none).
+    """
+    import numpy as np
+
+    series = np.asarray(series_dates, dtype="datetime64[ns]")
+    return np.searchsorted(series, np.asarray(targets, dtype="datetime64[ns]"), side="right") - 1
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv != ["build"]:
+        print(__doc__)
+        sys.exit(2)
+
+    rows = build()
+    write_table(rows)
+    print(f"✅ {len(rows)} closures from {FIRST_YEAR} to {LAST_YEAR} written to {HOLIDAYS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
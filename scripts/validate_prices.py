@@ -0,0 +1,261 @@
+"""
+Price data integrity checks.
+
+Scans every symbol in one vectorized pass over the concatenated Date and
+Close columns, with the boundaries between symbols masked out:
+
+  missing      no stored or raw data for the symbol
+  unsorted     a date not after the previous one (duplicates included)
+  nonpositive  a Close that is zero, negative or missing
+  gap          more than MAX_MISSING_SESSIONS trading-calendar sessions
+               missing between consecutive bars
+  future       a bar dated after today
+  stale        last bar more than MAX_STALE_SESSIONS sessions behind the
+               last trading session (see expected_session), so a run in
+               which every fetch failed is still caught
+  outlier      a daily log return beyond OUTLIER_SIGMAS standard deviations
+               of the symbol's returns
+  split        an outlier return whose price ratio is within SPLIT_TOLERANCE
+               of a typical split ratio (2:1, 3:1, 1:2, ...)
+
+missing, unsorted, nonpositive, future and stale are errors wherever they occur; gaps and
+splits only within the last RECENT_SESSIONS bars, since older history has
+already been through earlier runs. Everything else, and all outliers, is a
+warning: genuine market moves must still reach the alerts.
+
+Symbols with an error are quarantined. The evaluate stage keeps their
+alerts at the values of the previous snapshot instead of trusting the new
+bars, so bad data cannot flip the state (or open an issue) by itself.
+The full report goes to data/output/validation.json.
+
+Usage:
+    python scripts/validate_prices.py
+"""
+
+import json
+import sys
+from datetime import timedelta
+from pathlib import Path
+
+import numpy as np
+
+import instrument
+import price_store
+import trading_calendar
+from build_cache import write_if_changed
+from indicators import symbols
+
+REPORT_FILE = Path("data/output/validation.json")
+
+MAX_MISSING_SESSIONS = 0
+MAX_STALE_SESSIONS = 3
+RECENT_SESSIONS = 5
+OUTLIER_SIGMAS = 10
+SPLIT_RATIOS = [2, 3, 4, 5, 10, 3 / 2]
+SPLIT_TOLERANCE = 0.03
+
+ERROR_CHECKS = {"missing", "unsorted", "nonpositive", "future", "stale"}
+RECENT_ERROR_CHECKS = {"gap", "split"}
+
+
+def load_columns(symbol):
+    """
+    (dates as datetime64[D], closes) for one symbol, memory-mapped from the
+    store when it has one, or None if there is no data at all.
+    """
+    if price_store.read_meta(symbol) is None:
+        df = price_store.load_csv(symbol)
+        if df is None:
+            return None
+        return df["Date"].to_numpy().astype("datetime64[D]"), df["Close"].to_numpy(dtype="float64")
+
+    d = price_store.dates(symbol)
+    if d is None:
+        return np.array([], dtype="datetime64[D]"), np.array([], dtype="float64")
+    return d.astype("datetime64[D]"), np.asarray(price_store.column(symbol, "Close"), dtype="float64")
+
+
+def split_like(ratio):
+    """
+    Whether each price ratio is within SPLIT_TOLERANCE of a split ratio or
+    its inverse.
+    """
+    log_ratio = np.abs(np.log(ratio))[:, None]
+    targets = np.log(np.array(SPLIT_RATIOS, dtype="float64"))[None, :]
+    return (np.abs(log_ratio - targets) < np.log1p(SPLIT_TOLERANCE)).any(axis=1)
+
+
+def scan(columns, today):
+    """
+    Run every check over {symbol: (dates, closes)} at once. Returns the
+    symbols with data, the row offset of each one's first bar (plus the
+    total), the concatenated dates and {check: mask} flagging the bar each
+    problem was found on.
+    """
+    names = [s for s, c in columns.items() if c is not None and len(c[0])]
+    lengths = np.array([len(columns[s][0]) for s in names], dtype=np.int64)
+    starts = np.r_[0, np.cumsum(lengths)]
+    n = int(starts[-1])
+    days = np.concatenate([columns[s][0] for s in names]) if names else np.array([], dtype="datetime64[D]")
+    close = np.concatenate([columns[s][1] for s in names]) if names else np.array([], dtype="float64")
+
+    # Pairs (i - 1, i) within one symbol; the first bar of each has none.
+    paired = np.ones(n, dtype=bool)
+    paired[starts[:-1]] = False
+    prev = np.maximum(np.arange(n) - 1, 0)
+
+    step = (days - days[prev]).astype(np.int64)
+    positive = close > 0
+    masks = {
+        "unsorted": paired & (step <= 0),
+        "nonpositive": ~positive,
+        "future": days > today,
+    }
+
+    # Only steps longer than the allowed gap can skip that many sessions.
+    wide = paired & (step > MAX_MISSING_SESSIONS + 1)
+    missing = np.zeros(n, dtype=np.int64)
+    missing[wide] = np.busday_count(days[prev][wide] + 1, days[wide], busdaycal=trading_calendar.busdaycalendar())
+    masks["gap"] = missing > MAX_MISSING_SESSIONS
+
+    valid = paired & positive & positive[prev]
+    returns = np.zeros(n)
+    returns[valid] = np.log(close[valid] / close[prev][valid])
+
+    # Per-symbol spread of returns from segment sums of r and r^2.
+    counts = np.add.reduceat(valid.astype(np.int64), starts[:-1]) if n else np.zeros(0, dtype=np.int64)
+    sums = np.add.reduceat(returns, starts[:-1]) if n else np.zeros(0)
+    squares = np.add.reduceat(returns ** 2, starts[:-1]) if n else np.zeros(0)
+    mean = sums / np.maximum(counts, 1)
+    std = np.sqrt(np.maximum(squares / np.maximum(counts, 1) - mean ** 2, 0))
+    sigma = np.repeat(std, lengths)
+
+    outlier = valid & (np.abs(returns) > OUTLIER_SIGMAS * sigma) & (sigma > 0)
+    masks["outlier"] = outlier
+    masks["split"] = np.zeros(n, dtype=bool)
+    masks["split"][outlier] = split_like(np.exp(returns[outlier]))
+
+    return names, starts, days, masks
+
+
+def expected_session(today, freshest):
+    """
+    The session every symbol should have reached: the last session on or
+    before `today`. Today's own bars may not be published yet, so when
+    today is a session the freshest stored bar may stand in for it, but
+    never for anything older than the previous session.
+    """
+    expected = trading_calendar.last_session(today.item())
+    if expected != today.item():
+        return np.datetime64(expected, "D")
+    previous = np.datetime64(trading_calendar.last_session(expected - timedelta(days=1)), "D")
+    if freshest is None:
+        return previous
+    return min(np.datetime64(expected, "D"), max(freshest, previous))
+
+
+def check(columns, today=None):
+    """
+    Validation report for {symbol: (dates, closes) or None}: per symbol,
+    each failed check with its level, count and latest date, and the list
+    of quarantined symbols.
+    """
+    today = np.datetime64(today or "today", "D")
+    names, starts, days, masks = scan(columns, today)
+    lengths = np.diff(starts)
+    last = days[starts[1:] - 1]
+    current = last[last <= today]
+    as_of = current.max() if len(current) else None
+
+    # Bars within the last RECENT_SESSIONS of their symbol.
+    symbol_of = np.repeat(np.arange(len(names)), lengths)
+    recent = np.arange(len(days)) >= starts[1:][symbol_of] - RECENT_SESSIONS
+
+    stale = np.zeros(len(names), dtype=bool)
+    if len(names):
+        expected = expected_session(today, as_of)
+        behind = np.busday_count(np.minimum(last, expected), expected, busdaycal=trading_calendar.busdaycalendar())
+        stale = behind > MAX_STALE_SESSIONS
+
+    problems = {s: {} for s in names}
+    for s, c in columns.items():
+        if c is None or not len(c[0]):
+            problems[s] = {"missing": {"level": "error", "count": 1, "last": None}}
+
+    for name, mask in masks.items():
+        hits = np.flatnonzero(mask)
+        if not len(hits):
+            continue
+        # Latest flagged bar per symbol, and whether any is recent.
+        symbol_hits = symbol_of[hits]
+        counts = np.bincount(symbol_hits, minlength=len(names))
+        latest = np.full(len(names), -1)
+        np.maximum.at(latest, symbol_hits, hits)
+        any_recent = np.bincount(symbol_hits, weights=recent[hits], minlength=len(names)) > 0
+        for i in np.flatnonzero(counts):
+            error = name in ERROR_CHECKS or (name in RECENT_ERROR_CHECKS and any_recent[i])
+            problems[names[i]][name] = {
+                "level": "error" if error else "warning",
+                "count": int(counts[i]),
+                "last": str(days[latest[i]]),
+            }
+
+    for i in np.flatnonzero(stale):
+        problems[names[i]]["stale"] = {"level": "error", "count": 1, "last": str(last[i])}
+
+    quarantined = [
+        s for s, found in problems.items()
+        if any(p["level"] == "error" for p in found.values())
+    ]
+    return {
+        "as_of": None if as_of is None else str(as_of),
+        "symbols": len(columns),
+        "quarantined": quarantined,
+        "problems": {s: found for s, found in problems.items() if found},
+    }
+
+
+def validate(symbol_list=None):
+    symbol_list = symbols() if symbol_list is None else symbol_list
+    with instrument.span("validate"):
+        columns = {s: load_columns(s) for s in symbol_list}
+        instrument.add(rows=sum(len(c[0]) for c in columns.values() if c is not None))
+        return check(columns)
+
+
+def load_report(path=REPORT_FILE):
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_report(report, path=REPORT_FILE):
+    write_if_changed(path, json.dumps(report, indent=2))
+
+
+def show(report, warnings=True):
+    count = 0
+    for symbol, found in report["problems"].items():
+        for name, p in found.items():
+            if p["level"] == "error":
+                print(f"❌ {symbol}: {name} x{p['count']} (latest {p['last']})")
+            elif warnings:
+                print(f"⚠️  {symbol}: {name} x{p['count']} (latest {p['last']})")
+            else:
+                count += 1
+    if count:
+        print(f"ℹ️  {count} data warnings; see {REPORT_FILE}")
+    if report["quarantined"]:
+        print(f"⚠️  Quarantined: {', '.join(report['quarantined'])}")
+
+
+def main():
+    report = validate(sys.argv[1:] or None)
+    write_report(report)
+    show(report)
+    print(f"✅ Validated {report['symbols']} symbols as of {report['as_of']} — {len(report['quarantined'])} quarantined")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,10 @@
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# The scripts import each other by module name and read config/ relative to
+# the repo root, as they do when run from there.
+sys.path.insert(0, str(ROOT / "scripts"))
+os.chdir(ROOT)
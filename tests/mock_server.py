@@ -0,0 +1,56 @@
+"""
+Local HTTP stand-in for the external services the scripts call.
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class MockServer:
+    """
+    Serves responses from `handler(method, path, query, body)`, which
+    returns (status, body bytes or JSON-able). Every request is recorded in
+    `requests` as (method, path, query, body).
+    """
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def respond(self, method):
+                url = urlparse(self.path)
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                server.requests.append((method, url.path, query, body, dict(self.headers)))
+                status, payload = server.handler(method, url.path, query, body)
+                if not isinstance(payload, bytes):
+                    payload = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def do_GET(self):
+                self.respond("GET")
+
+            def do_POST(self):
+                self.respond("POST")
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
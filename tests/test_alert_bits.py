@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+import alert_bits
+
+
+def record(tmp_path, date, **alerts):
+    alert_bits.record(date, alerts, tmp_path / "alerts", tmp_path / "registry.json")
+
+
+def test_append_reads_only_the_meta(tmp_path, monkeypatch):
+    record(tmp_path, "2024-03-01", a=True, b=False)
+    monkeypatch.setattr(alert_bits, "read", lambda *args: pytest.fail("appending read the history"))
+    record(tmp_path, "2024-03-04", a=False, b=pd.NA)
+    assert alert_bits.read_meta(tmp_path / "alerts")["rows"] == 2
+
+
+def test_rerun_and_older_sessions_rewrite_in_order(tmp_path):
+    record(tmp_path, "2024-03-04", a=True, b=True)
+    record(tmp_path, "2024-03-04", a=False, b=True)
+    record(tmp_path, "2024-03-01", a=True, b=False)
+    record(tmp_path, "2024-03-05", a=True, b=pd.NA)
+
+    frame = alert_bits.query(store_dir=tmp_path / "alerts", registry_file=tmp_path / "registry.json")
+    assert list(frame.index.strftime("%Y-%m-%d")) == ["2024-03-01", "2024-03-04", "2024-03-05"]
+    assert frame["a"].tolist() == [True, False, True]
+    assert frame["b"].tolist() == [False, True, pd.NA]
+    assert alert_bits.read_meta(tmp_path / "alerts")["last"] == alert_bits.to_days(["2024-03-05"])[0]
@@ -0,0 +1,13 @@
+import numpy as np
+
+import alert_events
+
+
+def test_active_uses_each_alerts_last_edge():
+    events = np.zeros(6, dtype=alert_events.EVENT)
+    events["day"] = [1, 1, 2, 3, 3, 4]
+    events["alert"] = [0, 2, 0, 2, 0, 3]
+    events["edge"] = [1, 1, -1, -1, 1, 1]
+
+    np.testing.assert_array_equal(alert_events.active(events, 5), [True, False, False, True, False])
+    np.testing.assert_array_equal(alert_events.active(events[:0], 2), [False, False])
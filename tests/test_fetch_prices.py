@@ -0,0 +1,126 @@
+import importlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import price_store
+from mock_server import MockServer
+
+
+def bars(closes, start="2024-01-02"):
+    dates = pd.bdate_range(start, periods=len(closes))
+    closes = np.asarray(closes, dtype="float64")
+    return pd.DataFrame({
+        "Date": dates,
+        "Open": closes,
+        "High": closes * 1.01,
+        "Low": closes * 0.99,
+        "Close": closes,
+        "Volume": np.full(len(closes), 1_000_000),
+    })
+
+
+class Stooq:
+    """
+    Serves `history` as Stooq's CSV endpoint does, honouring d1/d2.
+    """
+
+    def __init__(self, history):
+        self.history = history
+
+    def __call__(self, method, path, query, body):
+        df = self.history
+        if "d1" in query:
+            df = df[df["Date"] >= pd.Timestamp(query["d1"])]
+        if "d2" in query:
+            df = df[df["Date"] <= pd.Timestamp(query["d2"])]
+        return 200, df.to_csv(index=False, date_format="%Y-%m-%d").encode()
+
+
+@pytest.fixture
+def stooq(monkeypatch, tmp_path):
+    provider = Stooq(bars(100 + np.arange(60.0)))
+    with MockServer(provider) as server:
+        monkeypatch.setenv("STOOQ_BASE_URL", server.url + "/q/d/l/")
+        fetch_prices = importlib.reload(importlib.import_module("fetch_prices"))
+        monkeypatch.chdir(tmp_path)
+        yield fetch_prices, provider, server
+
+
+def stored_close():
+    return price_store.load("SPY")["Close"].to_numpy()
+
+
+def test_incremental_fetch_appends_new_sessions(stooq):
+    fetch_prices, provider, server = stooq
+    full = provider.history
+    provider.history = full.iloc[:50]
+    assert fetch_prices.fetch("SPY", "spy.us")["rows"] == 50
+
+    provider.history = full
+    stats = fetch_prices.fetch("SPY", "spy.us")
+    assert stats["error"] is None and stats["rows"] == 10
+    assert "d1" in server.requests[-1][2]
+    np.testing.assert_array_equal(stored_close(), full["Close"].to_numpy())
+
+
+def test_revised_tail_bar_is_rewritten(stooq):
+    fetch_prices, provider, server = stooq
+    fetch_prices.fetch("SPY", "spy.us")
+
+    revised = provider.history.copy()
+    revised.loc[revised.index[-1], "Close"] += 1
+    provider.history = revised
+    fetch_prices.fetch("SPY", "spy.us")
+
+    assert len(server.requests) == 2
+    np.testing.assert_array_equal(stored_close(), revised["Close"].to_numpy())
+
+
+def test_back_adjusted_history_is_refetched_in_full(stooq):
+    fetch_prices, provider, server = stooq
+    fetch_prices.fetch("SPY", "spy.us")
+
+    # An ex-dividend date two sessions before the end: the provider rescales
+    # every earlier bar, and adds two new sessions.
+    adjusted = bars(100 + np.arange(62.0))
+    before = adjusted.index < 58
+    for col in ("Open", "High", "Low", "Close"):
+        adjusted.loc[before, col] *= 0.98
+    provider.history = adjusted
+
+    stats = fetch_prices.fetch("SPY", "spy.us")
+    assert stats["error"] is None and stats["rows"] == 62
+    # The incremental request, then the full one
+    assert "d1" in server.requests[-2][2] and "d1" not in server.requests[-1][2]
+    np.testing.assert_allclose(stored_close(), adjusted["Close"].to_numpy(), rtol=1e-12)
+
+
+def test_constant_ratio_overlap_is_refetched_in_full(stooq):
+    fetch_prices, provider, server = stooq
+    fetch_prices.fetch("SPY", "spy.us")
+
+    adjusted = provider.history.copy()
+    for col in ("Open", "High", "Low", "Close"):
+        adjusted[col] *= 0.99
+    provider.history = adjusted
+    fetch_prices.fetch("SPY", "spy.us")
+
+    assert len(server.requests) == 3
+    np.testing.assert_allclose(stored_close(), adjusted["Close"].to_numpy(), rtol=1e-12)
+
+
+def test_revised_volume_is_merged_without_a_full_refetch(stooq):
+    fetch_prices, provider, server = stooq
+    fetch_prices.fetch("SPY", "spy.us")
+
+    revised = provider.history.copy()
+    revised["Volume"] += 12_345
+    provider.history = revised
+    fetch_prices.fetch("SPY", "spy.us")
+
+    assert len(server.requests) == 2
+    stored = price_store.load("SPY")
+    overlap = stored["Date"] >= pd.Timestamp(server.requests[-1][2]["d1"])
+    np.testing.assert_array_equal(stored["Volume"][overlap], revised["Volume"][overlap.to_numpy()])
@@ -0,0 +1,71 @@
+import pytest
+
+import history_store
+
+
+def row(date, state="NOMINAL", severity=0):
+    return {"date": date, "state": state, "severity": severity}
+
+
+def assert_consistent(path, expected):
+    """
+    The CSV holds `expected`, and the index and meta describe it exactly as
+    a fresh re-index would.
+    """
+    expected = [history_store.normalize(r) for r in expected]
+    meta = history_store.read_meta(path)
+    assert history_store.consistent(meta, path)
+    assert history_store.scan(path=path) == expected
+
+    stored = (path.read_bytes(), history_store.index_file(path).read_bytes())
+    fresh = path.with_name("fresh.csv")
+    rebuilt = history_store.write(expected, fresh)
+    assert stored == (fresh.read_bytes(), history_store.index_file(fresh).read_bytes())
+    for key in ("rows", "bytes", "last_offset", "last", "run"):
+        assert meta[key] == rebuilt[key], key
+
+
+@pytest.fixture
+def history(tmp_path):
+    path = tmp_path / "state_history.csv"
+    history_store.write([row("2024-01-05"), row("2024-01-12", "DOWNTURN", 1), row("2024-01-19", "DOWNTURN", 2)], path)
+    return path
+
+
+def test_newer_date_is_appended(history):
+    generation = history_store.generation(path=history)
+    assert history_store.upsert(row("2024-01-26", "DOWNTURN", 3), history)
+
+    assert_consistent(history, [row("2024-01-05"), row("2024-01-12", "DOWNTURN", 1),
+                                row("2024-01-19", "DOWNTURN", 2), row("2024-01-26", "DOWNTURN", 3)])
+    assert history_store.run(history) == {"state": "DOWNTURN", "weeks": 3}
+    assert history_store.generation(path=history) == generation
+
+
+def test_same_date_is_replaced(history):
+    generation = history_store.generation(path=history)
+    assert not history_store.upsert(row("2024-01-19", "DOWNTURN", 2), history)
+    assert history_store.upsert(row("2024-01-19", "RECOVERY", 0), history)
+
+    assert_consistent(history, [row("2024-01-05"), row("2024-01-12", "DOWNTURN", 1), row("2024-01-19", "RECOVERY", 0)])
+    assert history_store.run(history) == {"state": "RECOVERY", "weeks": 1}
+    assert history_store.generation(path=history) != generation
+
+
+def test_older_date_is_inserted(history):
+    assert history_store.upsert(row("2024-01-10", "DOWNTURN", 1), history)
+
+    assert_consistent(history, [row("2024-01-05"), row("2024-01-10", "DOWNTURN", 1),
+                                row("2024-01-12", "DOWNTURN", 1), row("2024-01-19", "DOWNTURN", 2)])
+    assert history_store.run(history) == {"state": "DOWNTURN", "weeks": 3}
+    assert history_store.before("2024-01-12", history) == (
+        history_store.normalize(row("2024-01-10", "DOWNTURN", 1)), {"state": "DOWNTURN", "weeks": 1},
+    )
+
+
+def test_first_row_bootstraps_the_store(tmp_path):
+    path = tmp_path / "state_history.csv"
+    assert history_store.upsert(row("2024-01-05"), path)
+
+    assert_consistent(path, [row("2024-01-05")])
+    assert history_store.run(path) == {"state": "NOMINAL", "weeks": 1}
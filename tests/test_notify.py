@@ -0,0 +1,90 @@
+import json
+import time
+
+import pytest
+
+import http_client
+import notify
+from mock_server import MockServer
+
+TIMEOUT = 0.3
+
+
+@pytest.fixture(autouse=True)
+def no_backoff(monkeypatch):
+    monkeypatch.setattr(notify, "BACKOFF_SECONDS", 0.01)
+
+
+def sample_event():
+    snapshot = {"date": "2024-03-01", "state": "DOWNTURN", "severity": 2}
+    return notify.event(snapshot, "Market Correction Watch: DOWNTURN", "Severity 2", source="test")
+
+
+class GitHub:
+    """
+    Issues API stand-in. The first `slow` POSTs open the issue but answer
+    only after the client has timed out.
+    """
+
+    def __init__(self, slow=0, fail=0):
+        self.issues = []
+        self.slow = slow
+        self.fail = fail
+
+    def __call__(self, method, path, query, body):
+        if method == "GET":
+            return 200, self.issues[::-1]
+        if self.fail:
+            self.fail -= 1
+            return 503, {"message": "unavailable"}
+        issue = dict(json.loads(body), html_url=f"https://github.test/issues/{len(self.issues) + 1}")
+        self.issues.append(issue)
+        if self.slow:
+            self.slow -= 1
+            time.sleep(TIMEOUT * 3)
+        return 201, issue
+
+
+def github_sink(server):
+    return notify.GitHubIssueSink("token", "owner/repo", server.url)
+
+
+def test_github_timeout_does_not_open_a_second_issue():
+    api = GitHub(slow=1)
+    with MockServer(api) as server:
+        ref = notify.deliver(github_sink(server), sample_event(), retries=2, timeout=TIMEOUT)
+
+    assert len(api.issues) == 1
+    assert ref == api.issues[0]["html_url"]
+    assert [m for m, *_ in server.requests] == ["POST", "GET"]
+
+
+def test_github_retries_server_errors():
+    api = GitHub(fail=2)
+    with MockServer(api) as server:
+        ref = notify.deliver(github_sink(server), sample_event(), retries=3, timeout=TIMEOUT)
+
+    assert len(api.issues) == 1
+    assert ref == api.issues[0]["html_url"]
+    assert "<!-- market-watch:" in api.issues[0]["body"]
+
+
+def test_webhook_permanent_error_is_not_retried():
+    with MockServer(lambda *request: (422, {"message": "bad payload"})) as server:
+        with pytest.raises(http_client.PermanentError):
+            notify.deliver(notify.WebhookSink(server.url + "/hook"), sample_event(), retries=3, timeout=TIMEOUT)
+    assert len(server.requests) == 1
+
+
+def test_dispatch_skips_delivered_events(tmp_path):
+    ledger = tmp_path / "notifications.json"
+    api = GitHub()
+    e = sample_event()
+    with MockServer(api) as server:
+        first = notify.dispatch([e], [github_sink(server)], ledger, timeout=TIMEOUT)
+        second = notify.dispatch([e], [github_sink(server)], ledger, timeout=TIMEOUT)
+
+    assert [status for _, _, status, _ in first] == ["sent"]
+    assert [status for _, _, status, _ in second] == ["duplicate"]
+    assert len(api.issues) == 1
+    assert json.loads(ledger.read_text())[e["key"]]["github"]["ref"] == api.issues[0]["html_url"]
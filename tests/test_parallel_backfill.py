@@ -0,0 +1,27 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import indicators
+import parallel_backfill
+from indicators import ALERTS, alert_matrix
+
+
+def synthetic_prices(sessions=900, seed=7):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range("2020-01-01", periods=sessions)
+    prices = {}
+    for i, symbol in enumerate(indicators.symbols(ALERTS)):
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, sessions)))
+        # Later symbols start later, so some cutoffs precede their data.
+        prices[symbol] = pd.DataFrame({"Date": dates[i * 40:], "Close": close[i * 40:]})
+    return prices
+
+
+@pytest.mark.parametrize("workers", [1, 3, 8])
+def test_sharded_matrix_equals_serial(workers):
+    prices = synthetic_prices()
+    cutoffs = pd.bdate_range("2019-12-01", "2023-06-30", freq="W-FRI")
+    serial = alert_matrix(prices, cutoffs)
+    sharded = parallel_backfill.alert_matrix(prices, cutoffs, workers=workers)
+    pd.testing.assert_frame_equal(sharded, serial)
@@ -0,0 +1,76 @@
+import pandas as pd
+
+import history_store
+import summarize_history
+
+
+def weekly_rows(states, start="2024-01-05"):
+    dates = pd.date_range(start, periods=len(states), freq="W-FRI")
+    return [
+        {"date": d.date().isoformat(), "state": s, "severity": "1" if s == "DOWNTURN" else "0"}
+        for d, s in zip(dates, states)
+    ]
+
+
+def summarize(path, prior):
+    rows = history_store.scan(path=path)
+    return summarize_history.update(rows, prior, history_store.generation(path=path))
+
+
+def full(path):
+    return summarize(path, (None, None, None))[:2]
+
+
+def test_appended_rows_are_folded_in(tmp_path):
+    path = tmp_path / "state_history.csv"
+    rows = weekly_rows(["NOMINAL"] * 7 + ["DOWNTURN"] * 3 + ["NOMINAL"] * 20)
+    history_store.write(rows[:25], path)
+    monthly, quarterly, state, _ = summarize(path, (None, None, None))
+
+    for row in rows[25:]:
+        history_store.upsert(row, path)
+    monthly, quarterly, state, incremental = summarize(path, (state, monthly, quarterly))
+
+    assert incremental
+    assert (monthly, quarterly) == full(path)
+
+
+def test_rewritten_rows_force_a_recompute(tmp_path):
+    path = tmp_path / "state_history.csv"
+    rows = weekly_rows(["NOMINAL"] * 7 + ["DOWNTURN"] * 3 + ["NOMINAL"] * 20)
+    history_store.write(rows, path)
+    monthly, quarterly, state, _ = summarize(path, (None, None, None))
+
+    # Same row count and last row, different history.
+    rewritten = weekly_rows(["DOWNTURN"] * 20) + rows[20:]
+    history_store.write(rewritten, path)
+    monthly, quarterly, state, incremental = summarize(path, (state, monthly, quarterly))
+
+    assert not incremental
+    assert (monthly, quarterly) == full(path)
+    assert quarterly["2024-Q1"]["dominant_state"] == "DOWNTURN"
+
+
+def test_hand_edited_rows_force_a_recompute(tmp_path):
+    path = tmp_path / "state_history.csv"
+    rows = weekly_rows(["RECOVERY"] * 10 + ["NOMINAL"] * 20)
+    history_store.write(rows, path)
+    monthly, quarterly, state, _ = summarize(path, (None, None, None))
+
+    # Same size, so only the modification time gives the edit away.
+    path.write_text(path.read_text().replace("RECOVERY,0", "DOWNTURN,1"))
+    monthly, quarterly, state, incremental = summarize(path, (state, monthly, quarterly))
+
+    assert not incremental
+    assert (monthly, quarterly) == full(path)
+
+
+def test_rows_without_a_generation_are_checked_by_digest():
+    rows = weekly_rows(["NOMINAL"] * 7 + ["DOWNTURN"] * 3 + ["NOMINAL"] * 20)
+    monthly, quarterly, state, _ = summarize_history.update(rows, (None, None, None))
+
+    rewritten = weekly_rows(["DOWNTURN"] * 20) + rows[20:]
+    result = summarize_history.update(rewritten, (state, monthly, quarterly))
+
+    assert not result[3]
+    assert result[:2] == summarize_history.update(rewritten, (None, None, None))[:2]
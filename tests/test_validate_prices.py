@@ -0,0 +1,27 @@
+import numpy as np
+
+import trading_calendar
+import validate_prices
+
+
+def columns_through(last):
+    days = trading_calendar.sessions("2024-01-02", last)
+    return days, np.linspace(100, 110, len(days))
+
+
+def test_every_symbol_behind_the_calendar_is_stale():
+    # All fetches failed for two weeks: nothing is behind the freshest bar,
+    # but everything is behind the calendar.
+    columns = {s: columns_through("2024-03-01") for s in ("SPY", "HYG")}
+    report = validate_prices.check(columns, today="2024-03-15")
+
+    assert report["quarantined"] == ["SPY", "HYG"]
+    assert all("stale" in found for found in report["problems"].values())
+
+
+def test_todays_unpublished_bar_is_not_stale():
+    columns = {"SPY": columns_through("2024-03-14"), "HYG": columns_through("2024-03-11")}
+    report = validate_prices.check(columns, today="2024-03-15")
+
+    assert report["quarantined"] == []
+    assert report["as_of"] == "2024-03-14"